@@ -0,0 +1,112 @@
+"""Move COMPLETED projects and their milestones into the archive tables.
+
+Run periodically (cron, k8s CronJob) from the backend directory:
+
+    python -m app.archive --older-than-days 30
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, delete
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .notifications import record_change
+from .models import (
+    ArchivedMilestone,
+    ArchivedProject,
+    Milestone,
+    Project,
+    ProjectStatus
+)
+
+PROJECT_COLUMNS = [
+    "id", "name", "description", "budget", "status",
+    "creator_id", "created_at", "updated_at"
+]
+MILESTONE_COLUMNS = [
+    "id", "project_id", "title", "description", "requested_amount", "status",
+    "contractor_id", "auditor_id", "created_at", "approved_at"
+]
+
+
+def archive_completed_projects(
+    db: Session,
+    older_than_days: int = 30,
+    batch_size: int = 500
+) -> int:
+    """Archive one batch of COMPLETED projects; returns the number moved.
+
+    Copy and delete happen in a single transaction, so a project is always in
+    exactly one of the hot or archive tables. Milestones leave the hot table
+    through the ON DELETE CASCADE on milestones.project_id.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    project_ids = db.execute(
+        select(Project.id)
+        .where(
+            Project.status == ProjectStatus.COMPLETED,
+            Project.updated_at < cutoff
+        )
+        .order_by(Project.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    if not project_ids:
+        return 0
+
+    milestone_ids = db.execute(
+        select(Milestone.id).where(Milestone.project_id.in_(project_ids))
+    ).scalars().all()
+
+    db.execute(
+        insert(ArchivedProject).from_select(
+            PROJECT_COLUMNS,
+            select(*[getattr(Project, c) for c in PROJECT_COLUMNS])
+            .where(Project.id.in_(project_ids))
+        )
+    )
+    db.execute(
+        insert(ArchivedMilestone).from_select(
+            MILESTONE_COLUMNS,
+            select(*[getattr(Milestone, c) for c in MILESTONE_COLUMNS])
+            .where(Milestone.project_id.in_(project_ids))
+        )
+    )
+    db.execute(
+        delete(Project)
+        .where(Project.id.in_(project_ids))
+        .execution_options(synchronize_session=False)
+    )
+    record_change(db, "project", "delete", *project_ids)
+    record_change(db, "milestone", "delete", *milestone_ids)
+    db.commit()
+
+    return len(project_ids)
+
+
+def run(older_than_days: int = 30, batch_size: int = 500) -> int:
+    """Archive in batches until no eligible project is left"""
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            moved = archive_completed_projects(db, older_than_days, batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+    finally:
+        db.close()
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive COMPLETED projects")
+    parser.add_argument("--older-than-days", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    moved = run(args.older_than_days, args.batch_size)
+    print(f"✅ Archived {moved} completed project(s)")
@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 300))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "govichain")
+
+
+# =========================================================
+# BACKENDS
+# =========================================================
+class LRUCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        """Set key only if it is absent (or expired); returns True if stored"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] >= time.monotonic():
+                return False
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return True
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCacheBackend:
+    """Shared cache speaking the Redis protocol.
+
+    Any client exposing ``get``/``set(ex=..., nx=...)``/``delete`` can be passed in,
+    which lets tests run against a local stand-in instead of a real server.
+    """
+
+    def __init__(self, url: str = CACHE_URL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "CACHE_URL points at Redis but the 'redis' package is not installed"
+                ) from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    def set(self, key: str, value: str, ttl: int):
+        self.client.set(key, value, ex=ttl)
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        return bool(self.client.set(key, value, ex=ttl, nx=True))
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{CACHE_KEY_PREFIX}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_backend(url: str = CACHE_URL):
+    """Build a cache backend from a CACHE_URL (memory:// or redis://)"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    return LRUCacheBackend()
+
+
+# =========================================================
+# ENTITY CACHE
+# =========================================================
+class EntityCache:
+    """Read-through cache of serialized entities keyed by kind and id"""
+
+    def __init__(self, backend, ttl: int = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {}
+        # key -> [generation, loads in flight]; invalidate bumps the generation
+        # so a load that read the row before a write does not cache it
+        self._loading = {}
+
+    def _key(self, kind: str, entity_id: int) -> str:
+        return f"{CACHE_KEY_PREFIX}:{kind}:{entity_id}"
+
+    def _record(self, kind: str, outcome: str):
+        with self._lock:
+            counters = self._stats.setdefault(kind, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def get(self, kind: str, entity_id: int) -> Optional[dict]:
+        try:
+            raw = self.backend.get(self._key(kind, entity_id))
+        except Exception:
+            # A cache outage must never fail the request; fall back to the DB
+            raw = None
+        if raw is None:
+            self._record(kind, "misses")
+            return None
+        self._record(kind, "hits")
+        return json.loads(raw)
+
+    def set(self, kind: str, entity_id: int, data: dict):
+        try:
+            self.backend.set(self._key(kind, entity_id), json.dumps(data), self.ttl)
+        except Exception:
+            pass
+
+    def _bump(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._loading:
+                    self._loading[key][0] += 1
+
+    def invalidate(self, kind: str, *entity_ids: int):
+        keys = [self._key(kind, entity_id) for entity_id in entity_ids]
+        self._bump(keys)
+        try:
+            self.backend.delete(*keys)
+        except Exception:
+            pass
+
+    def clear_local(self):
+        """Drop everything held in this process; a shared backend is left alone"""
+        self._bump(list(self._loading))
+        if isinstance(self.backend, LRUCacheBackend):
+            self.backend.clear()
+
+    def read_through(self, kind: str, entity_id: int, schema, loader: Callable):
+        """Return the cached entity, loading and serializing it on a miss.
+
+        Returns None when the loader finds nothing; misses are not cached.
+        A load that overlaps an invalidation of the same entity is returned
+        but not kept in the cache.
+        """
+        data = self.get(kind, entity_id)
+        if data is not None:
+            return data
+
+        key = self._key(kind, entity_id)
+        with self._lock:
+            entry = self._loading.setdefault(key, [0, 0])
+            entry[1] += 1
+            generation = entry[0]
+
+        try:
+            obj = loader()
+            if obj is None:
+                return None
+            data = schema.model_validate(obj).model_dump(mode="json")
+            self.set(kind, entity_id, data)
+        finally:
+            with self._lock:
+                entry = self._loading[key]
+                stale = entry[0] != generation
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._loading[key]
+
+        if stale:
+            # Checked after set: an invalidation that ran before our set has
+            # bumped the generation, one that runs after it deletes the key
+            try:
+                self.backend.delete(key)
+            except Exception:
+                pass
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_kind = {kind: dict(counters) for kind, counters in self._stats.items()}
+
+        hits = sum(c["hits"] for c in per_kind.values())
+        misses = sum(c["misses"] for c in per_kind.values())
+        for counters in per_kind.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else 0
+
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0,
+            "by_entity": per_kind
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+entity_cache = EntityCache(create_backend())
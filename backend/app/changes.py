@@ -0,0 +1,146 @@
+"""Monotonic change log behind the /changes feed.
+
+Every transaction that writes users, projects or milestones appends one row
+per changed entity to ``entity_changes`` just before it commits (see the
+session hooks in app.notifications). Clients keep the last ``seq`` they saw
+as a cursor and ask only for newer entries.
+
+Compact periodically from the backend directory:
+
+    python -m app.changes --retention-days 7
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, aliased
+
+from .database import SessionLocal
+from .models import ChangeLogCompaction, EntityChange, Milestone, Project, User
+from .schemas import MilestoneResponse, ProjectResponse, UserResponse
+
+ENTITY_MODELS = {
+    "user": (User, UserResponse),
+    "project": (Project, ProjectResponse),
+    "milestone": (Milestone, MilestoneResponse),
+}
+
+
+class CursorExpired(Exception):
+    """The requested cursor predates the compaction horizon"""
+
+
+# =========================================================
+# READ SIDE
+# =========================================================
+def current_cursor(db: Session) -> int:
+    latest = db.query(func.max(EntityChange.seq)).scalar() or 0
+    return max(latest, compaction_horizon(db))
+
+
+def compaction_horizon(db: Session) -> int:
+    return db.query(func.max(ChangeLogCompaction.horizon_seq)).scalar() or 0
+
+
+def changes_since(db: Session, since: int, limit: int) -> dict:
+    """Entities changed after ``since``, collapsed to their latest state"""
+    if since < compaction_horizon(db):
+        raise CursorExpired()
+
+    entries = db.query(EntityChange).filter(
+        EntityChange.seq > since
+    ).order_by(EntityChange.seq).limit(limit + 1).all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for entry in entries:
+        latest[(entry.entity, entry.entity_id)] = entry
+
+    # One query per entity kind for the current row of everything not deleted
+    ids_by_kind = {}
+    for (entity, entity_id), entry in latest.items():
+        if entry.op != "delete":
+            ids_by_kind.setdefault(entity, []).append(entity_id)
+
+    rows = {}
+    for entity, ids in ids_by_kind.items():
+        model, schema = ENTITY_MODELS[entity]
+        for obj in db.query(model).filter(model.id.in_(ids)):
+            rows[(entity, obj.id)] = schema.model_validate(obj).model_dump(mode="json")
+
+    changes = []
+    for key, entry in sorted(latest.items(), key=lambda item: item[1].seq):
+        data = rows.get(key)
+        # Deleted after this page was written; report the deletion now
+        op = "delete" if data is None else entry.op
+        changes.append({
+            "seq": entry.seq,
+            "entity": entry.entity,
+            "id": entry.entity_id,
+            "op": op,
+            "data": data
+        })
+
+    return {
+        "cursor": entries[-1].seq if entries else since,
+        "has_more": has_more,
+        "changes": changes
+    }
+
+
+# =========================================================
+# COMPACTION
+# =========================================================
+def compact(db: Session, retention_days: int = 7) -> int:
+    """Drop superseded entries, then everything older than the retention window.
+
+    Superseded entries (an entity changed again later) can go at any time:
+    a reader starting before them still sees the newer entry. Dropping old
+    tail entries moves the horizon, and cursors behind it get 410 Gone.
+    """
+    newer = aliased(EntityChange)
+    superseded = db.execute(
+        delete(EntityChange)
+        .where(
+            select(newer.seq)
+            .where(
+                newer.entity == EntityChange.entity,
+                newer.entity_id == EntityChange.entity_id,
+                newer.seq > EntityChange.seq
+            )
+            .exists()
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    horizon = db.query(func.max(EntityChange.seq)).filter(
+        EntityChange.changed_at < cutoff
+    ).scalar()
+
+    expired = 0
+    if horizon is not None:
+        expired = db.execute(
+            delete(EntityChange)
+            .where(EntityChange.seq <= horizon)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.add(ChangeLogCompaction(horizon_seq=horizon, removed=expired))
+
+    db.commit()
+    return superseded + expired
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the change feed log")
+    parser.add_argument("--retention-days", type=int, default=7)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        removed = compact(db, args.retention_days)
+    finally:
+        db.close()
+    print(f"✅ Removed {removed} change log entries")
@@ -1,22 +1,137 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
-
-load_dotenv()
+import threading
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+# Deadline of the HTTP request being served (app.deadlines); None outside requests
+request_deadline = ContextVar("request_deadline", default=None)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection and never
+    waits past the current request's deadline"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def _timeout(self):
+        deadline = request_deadline.get()
+        if deadline is None:
+            return self._pool_timeout
+        return min(self._pool_timeout, deadline.remaining())
 
-engine = create_engine(DATABASE_URL)
+    @_timeout.setter
+    def _timeout(self, value):
+        self._pool_timeout = value
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._wait_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def wait_stats(self):
+        with self._wait_lock:
+            return self.checkouts, self.total_wait, self.max_wait
+
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+if engine.dialect.name == "sqlite":
+    # SQLite ignores foreign keys, including ON DELETE CASCADE, unless asked
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 Base = declarative_base()
 
+
+def pool_status() -> dict:
+    """Connection pool statistics for health/observability endpoints"""
+    pool = engine.pool
+    checkouts, total_wait, max_wait = pool.wait_stats()
+
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool reports unopened slots as negative overflow
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "checkouts": checkouts,
+        "avg_wait_ms": round(total_wait / checkouts * 1000, 3) if checkouts else 0,
+        "max_wait_ms": round(max_wait * 1000, 3)
+    }
+
+
+def warm_pool(connections: int = DB_POOL_SIZE) -> float:
+    """Open pool connections ahead of traffic; returns the seconds it took"""
+    start = time.perf_counter()
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return time.perf_counter() - start
+
+
+@contextmanager
+def unit_of_work(db: Session):
+    """Run a write path as one transaction: a single commit at the end of the
+    block, rollback if anything in it raises. Build the response inside the
+    block (from RETURNING rows) so nothing is reloaded after the commit."""
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
 # Dependency
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
     try:
+        deadline = request_deadline.get()
+        if deadline is not None:
+            route = request.scope.get("route")
+            deadline.apply_route(request.method, getattr(route, "path", None))
+            # Take the connection up front: an exhausted pool sheds the
+            # request here (503) before any work is done
+            db.connection()
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
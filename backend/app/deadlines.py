@@ -0,0 +1,216 @@
+"""Per-request deadlines.
+
+Every HTTP request gets a deadline (REQUEST_DEADLINE_SECONDS, or a tighter
+per-route budget from ROUTE_DEADLINES). The deadline bounds:
+
+- the wait for a pooled connection: when the pool cannot hand one out in
+  time the request is shed with 503 instead of queueing behind the overload
+- each statement, through ``SET LOCAL statement_timeout`` on PostgreSQL
+- the request's life after the client disconnects: running queries are
+  cancelled so the connection and worker thread are freed
+
+Per-route budgets can be overridden with, e.g.
+
+    ROUTE_DEADLINES="GET /dashboard/stats=5,GET /milestones/filter/by-status=3"
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+from .database import SessionLocal, engine, request_deadline
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 30))
+
+# "METHOD /route/{template}" -> seconds, for routes that run heavy queries
+ROUTE_DEADLINES = {
+    "GET /dashboard/stats": 10,
+    "GET /dashboard/my-stats": 10,
+    "GET /milestones/filter/by-status": 10,
+    "GET /projects/filter/by-status": 10,
+    "GET /projects/progress": 10,
+}
+
+
+def _parse_route_deadlines(value: str) -> dict:
+    routes = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, seconds = item.rpartition("=")
+        routes[route.strip()] = float(seconds)
+    return routes
+
+
+ROUTE_DEADLINES.update(_parse_route_deadlines(os.getenv("ROUTE_DEADLINES", "")))
+
+
+class Deadline:
+    """Time budget of one request plus the DB connections working on it"""
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE_SECONDS):
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def apply_route(self, method: str, path: Optional[str]):
+        """Narrow the budget once routing has resolved the endpoint"""
+        seconds = ROUTE_DEADLINES.get(f"{method} {path}")
+        if seconds is not None:
+            self.expires_at = min(self.expires_at, self.started_at + seconds)
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def exceeded(self) -> bool:
+        return self.cancelled or self.remaining() <= 0
+
+    def attach(self, dbapi_connection):
+        with self._lock:
+            if self.cancelled:
+                _cancel_statement(dbapi_connection)
+            self._connections.add(dbapi_connection)
+
+    def detach(self, dbapi_connection):
+        with self._lock:
+            self._connections.discard(dbapi_connection)
+
+    def cancel(self):
+        """Abort whatever the request's connections are running"""
+        with self._lock:
+            self.cancelled = True
+            connections = list(self._connections)
+        for dbapi_connection in connections:
+            _cancel_statement(dbapi_connection)
+
+
+def _cancel_statement(dbapi_connection):
+    # psycopg2 sends a protocol-level cancel; sqlite3 interrupts the VM
+    cancel = getattr(dbapi_connection, "cancel", None) or getattr(dbapi_connection, "interrupt", None)
+    if cancel is None:
+        return
+    try:
+        cancel()
+    except Exception as e:
+        print(f"⚠️ Query cancellation failed: {e}")
+
+
+# Connections currently working for some request, so checkin can detach them
+_attached = {}
+_attached_lock = threading.Lock()
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _bind_deadline(session, transaction, connection):
+    deadline = request_deadline.get()
+    if deadline is None:
+        return
+
+    dbapi_connection = connection.connection.dbapi_connection
+    with _attached_lock:
+        _attached[id(dbapi_connection)] = deadline
+    deadline.attach(dbapi_connection)
+
+    if connection.dialect.name == "postgresql":
+        timeout_ms = max(int(deadline.remaining() * 1000), 1)
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
+@event.listens_for(engine, "checkin")
+def _unbind_deadline(dbapi_connection, connection_record):
+    # Runs before the connection goes back to the pool, so a late cancel can
+    # never hit another request's query
+    with _attached_lock:
+        deadline = _attached.pop(id(dbapi_connection), None)
+    if deadline is not None:
+        deadline.detach(dbapi_connection)
+
+
+# =========================================================
+# MIDDLEWARE
+# =========================================================
+class DeadlineMiddleware:
+    """Starts each request's deadline and watches for client disconnects.
+
+    The watcher is the only reader of the ASGI receive channel: request body
+    messages are handed to the app through a queue, and an ``http.disconnect``
+    before the response has finished cancels the request's queries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline()
+        token = request_deadline.set(deadline)
+        messages = asyncio.Queue()
+        response_complete = False
+        disconnected = False
+
+        async def watch():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    if not response_complete:
+                        await asyncio.to_thread(deadline.cancel)
+                    return
+
+        async def buffered_receive():
+            if disconnected and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def tracking_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await self.app(scope, buffered_receive, tracking_send)
+        finally:
+            watcher.cancel()
+            request_deadline.reset(token)
+
+
+# =========================================================
+# EXCEPTION HANDLERS
+# =========================================================
+def _unavailable(detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": detail},
+        headers={"Retry-After": "1"}
+    )
+
+
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return _unavailable("Server is busy, try again shortly")
+
+
+async def cancelled_query_handler(request: Request, exc: OperationalError):
+    deadline = request_deadline.get()
+    if deadline is None or not deadline.exceeded:
+        raise exc
+    return _unavailable("Request deadline exceeded")
+
+
+def install_deadlines(app):
+    app.add_middleware(DeadlineMiddleware)
+    app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+    app.add_exception_handler(OperationalError, cancelled_query_handler)
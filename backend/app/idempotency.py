@@ -0,0 +1,188 @@
+"""Idempotency-Key support for create endpoints.
+
+The key is stored in ``idempotency_keys`` in the same transaction as the
+row the request creates, so it is committed exactly when that row is. A
+duplicate that arrives while the first request is still running waits on the
+key's unique index. It then replays the stored response, or runs normally if
+the first request rolled back. Records expire after IDEMPOTENCY_TTL_SECONDS.
+To purge expired keys, run from the backend directory:
+
+    python -m app.idempotency purge
+"""
+import argparse
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import IdempotencyKey
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+MAX_KEY_LENGTH = 255
+
+
+class IdempotentRequest:
+    """Handle for one keyed request; ``replay`` is set when it already ran"""
+
+    def __init__(self, db: Session, ident: Optional[Tuple[str, int, str]], fingerprint: str):
+        self.db = db
+        self.ident = ident
+        self.fingerprint = fingerprint
+        self.replay = None
+        self.saved = False
+
+    def save(self, schema, obj):
+        """Record the serialized response; call inside the handler's unit of work"""
+        if self.ident is None:
+            return
+        scope, user_id, key = self.ident
+        response = schema.model_validate(obj).model_dump(mode="json")
+        self.db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key
+            )
+            .values(response=json.dumps(response))
+        )
+        self.saved = True
+
+
+class IdempotencyStore:
+    """Idempotency-Key -> original response, kept in the database"""
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS):
+        self.ttl = ttl
+
+    def _lookup(self, db: Session, ident: Tuple[str, int, str]):
+        scope, user_id, key = ident
+        return db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.response, IdempotencyKey.created_at)
+            .where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key
+            )
+        ).first()
+
+    def _replay(self, record, fingerprint: str) -> dict:
+        if record.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request body"
+            )
+        if record.response is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is already in progress"
+            )
+        return json.loads(record.response)
+
+    def _reserve(self, db: Session, ident: Tuple[str, int, str], fingerprint: str) -> Optional[dict]:
+        """Insert the key in db's open transaction; returns the stored response
+        instead if the key was already used"""
+        scope, user_id, key = ident
+        now = datetime.utcnow()
+
+        record = self._lookup(db, ident)
+        if record is not None:
+            if record.created_at >= now - timedelta(seconds=self.ttl):
+                return self._replay(record, fingerprint)
+            db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key
+            ))
+
+        try:
+            db.execute(insert(IdempotencyKey).values(
+                scope=scope,
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                created_at=now
+            ))
+        except IntegrityError:
+            # A concurrent duplicate committed first; we waited for it
+            db.rollback()
+            record = self._lookup(db, ident)
+            if record is None:
+                raise
+            return self._replay(record, fingerprint)
+        return None
+
+    @contextmanager
+    def request(
+        self,
+        db: Session,
+        scope: str,
+        user_id: int,
+        idempotency_key: Optional[str],
+        payload: BaseModel
+    ):
+        """Reserve the key in db's transaction for the duration of the handler.
+
+        Without a key the handler simply runs. A replay of a finished request
+        exposes the stored response, and a key reused with a different body
+        gets 422. The handler must ``save`` its response inside its unit of
+        work. If it fails instead, the reservation is rolled back with it and
+        the client can retry.
+        """
+        fingerprint = hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+        if not idempotency_key:
+            yield IdempotentRequest(db, None, fingerprint)
+            return
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"
+            )
+
+        ident = (scope, user_id, idempotency_key)
+        handle = IdempotentRequest(db, ident, fingerprint)
+        handle.replay = self._reserve(db, ident, fingerprint)
+        if handle.replay is not None:
+            db.rollback()
+            yield handle
+            return
+
+        try:
+            yield handle
+        finally:
+            if not handle.saved:
+                db.rollback()
+
+    def purge_expired(self, db: Session) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        removed = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff)
+        ).rowcount
+        db.commit()
+        return removed
+
+
+idempotency_store = IdempotencyStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage stored Idempotency-Keys")
+    parser.add_argument("command", choices=["purge"])
+    parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"✅ Purged {idempotency_store.purge_expired(db)} expired idempotency key(s)")
+    finally:
+        db.close()
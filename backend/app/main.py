@@ -1,9 +1,21 @@
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import contextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
 import sys
+import threading
 
-from .database import engine, Base
+from .database import DB_POOL_SIZE, warm_pool
+from .migrations import ensure_schema
+from .deadlines import install_deadlines
+from .partitions import maintain as maintain_partitions
+from .ratelimit import limit_by_client, limit_by_user
+from .notifications import start_change_listener, stop_change_listener
+from .risk import risk_scorer
+from .tasks import task_pool
 
 # Import routers
 from .routers import auth
@@ -11,6 +23,8 @@ from .routers import projects
 from .routers import milestones
 from .routers import users
 from .routers import dashboard
+from .routers import health
+from .routers import changes
 
 
 app = FastAPI(
@@ -19,6 +33,37 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Milliseconds per startup phase, reported at boot and on /health/startup
+app.state.startup_timings = {
+    "imports_ms": round((time.perf_counter() - _import_started) * 1000, 1)
+}
+
+
+@contextmanager
+def _startup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        app.state.startup_timings[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _warm_pool_in_background():
+    try:
+        seconds = warm_pool(DB_POOL_SIZE)
+        app.state.startup_timings["pool_warmup_ms"] = round(seconds * 1000, 1)
+    except Exception as e:
+        print(f"⚠️ Connection pool warm-up failed: {e}")
+
+
+def _maintain_partitions_in_background():
+    try:
+        created = maintain_partitions()["created"]
+        if created:
+            print(f"✅ Created milestone partitions for fiscal years {created}")
+    except Exception as e:
+        print(f"⚠️ Milestone partition maintenance failed: {e}")
+
 
 # =========================================================
 # DATABASE STARTUP CHECK
@@ -26,15 +71,17 @@ app = FastAPI(
 @app.on_event("startup")
 def startup_event():
     try:
-        # Check DB connection
-        with engine.connect() as connection:
-            connection.execute(text("SELECT 1"))
-
-        print("✅ Database connected successfully")
-
-        # Create tables AFTER successful connection
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database tables verified/created")
+        # One read of schema_version; also proves the database is reachable
+        with _startup_phase("schema_check"):
+            schema_state = ensure_schema()
+        print(f"✅ Database connected successfully (schema {schema_state})")
+        if schema_state.startswith("needs maintenance"):
+            print("⚠️ Run `python -m app.migrations` in a maintenance window to finish the schema update")
+
+        with _startup_phase("background_services"):
+            start_change_listener()
+            risk_scorer.start()
+            task_pool.start()
 
     except Exception as e:
         print("\n❌ ERROR: Cannot connect to PostgreSQL database.")
@@ -42,6 +89,25 @@ def startup_event():
         print(f"Details: {str(e)}\n")
         sys.exit(1)
 
+    # Traffic can arrive while the rest of the pool is still connecting
+    threading.Thread(target=_warm_pool_in_background, name="pool-warmup", daemon=True).start()
+    # Next fiscal years' partitions must exist before their first insert
+    threading.Thread(
+        target=_maintain_partitions_in_background, name="partition-maintenance", daemon=True
+    ).start()
+
+    timings = app.state.startup_timings
+    print("⏱️ Startup: " + ", ".join(
+        f"{name[:-3]} {ms:.0f}ms" for name, ms in timings.items()
+    ))
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    task_pool.stop()
+    risk_scorer.stop()
+    stop_change_listener()
+
 
 # =========================================================
 # CORS CONFIG
@@ -55,14 +121,23 @@ app.add_middleware(
 )
 
 
+# =========================================================
+# REQUEST DEADLINES
+# =========================================================
+install_deadlines(app)
+
+
 # =========================================================
 # ROUTERS
 # =========================================================
-app.include_router(auth.router)
-app.include_router(projects.router)
-app.include_router(milestones.router)
-app.include_router(users.router)
-app.include_router(dashboard.router)
+# Auth routes are limited per client IP, everything else per user and role
+app.include_router(auth.router, dependencies=[Depends(limit_by_client)])
+app.include_router(projects.router, dependencies=[Depends(limit_by_user)])
+app.include_router(milestones.router, dependencies=[Depends(limit_by_user)])
+app.include_router(users.router, dependencies=[Depends(limit_by_user)])
+app.include_router(dashboard.router, dependencies=[Depends(limit_by_user)])
+app.include_router(health.router)
+app.include_router(changes.router, dependencies=[Depends(limit_by_user)])
 
 
 # =========================================================
@@ -71,16 +146,3 @@ app.include_router(dashboard.router)
 @app.get("/")
 def root():
     return {"message": "Welcome to Govichain API"}
-
-
-# =========================================================
-# HEALTH CHECK
-# =========================================================
-@app.get("/health")
-def health_check():
-    try:
-        with engine.connect() as connection:
-            connection.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
-    except Exception:
-        return {"status": "unhealthy", "database": "disconnected"}
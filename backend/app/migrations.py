@@ -0,0 +1,153 @@
+"""Schema version check run at startup.
+
+``Base.metadata.create_all`` asks the database about every table on each
+boot. Instead, the models (and the list of migrations) are fingerprinted
+in-process and compared with the single row in ``schema_version``: when they
+match (the normal case) startup costs one indexed read. Only a new or changed
+model set runs create_all and the migrations, once, under a lock so
+concurrently booting workers do not race each other.
+
+MIGRATIONS covers what create_all cannot express. Each step must be
+idempotent, because every schema change runs all of them again. A step that
+would rewrite existing data (its check returns True) is not run at startup:
+the API boots on the old layout, warns, and leaves the version unrecorded
+until an operator runs it in a maintenance window:
+
+    python -m app.migrations
+"""
+import hashlib
+import re
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from .database import Base, engine
+from .models import SchemaVersion
+from .partitions import partition_milestones, partitioning_needs_operator
+
+SCHEMA_LOCK_ID = 740_041
+
+_PROJECT_FK = re.compile(
+    r'(FOREIGN KEY\s*\(\s*"?project_id"?\s*\)\s*REFERENCES\s+"?projects"?\s*\(\s*"?id"?\s*\))(?!\s*ON DELETE)',
+    re.IGNORECASE
+)
+
+
+def cascade_milestone_project_fk(connection: Connection):
+    """Recreate milestones.project_id with ON DELETE CASCADE on databases
+    created before Project.milestones used passive_deletes"""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        names = connection.execute(text("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = 'milestones'::regclass AND contype = 'f'
+              AND confrelid = 'projects'::regclass AND confdeltype <> 'c'
+        """)).scalars().all()
+        if not names:
+            return
+        for name in names:
+            connection.execute(text(f'ALTER TABLE milestones DROP CONSTRAINT "{name}"'))
+        connection.execute(text(
+            "ALTER TABLE milestones ADD FOREIGN KEY (project_id) "
+            "REFERENCES projects (id) ON DELETE CASCADE"
+        ))
+    elif dialect == "sqlite":
+        keys = connection.execute(text("PRAGMA foreign_key_list(milestones)")).mappings().all()
+        if all(k["on_delete"] == "CASCADE" for k in keys if k["table"] == "projects"):
+            return
+        # SQLite cannot alter a constraint, and rebuilding the table would fire
+        # the cascades of the tables referencing it. Adding an ON DELETE action
+        # leaves the stored rows unchanged, so the table definition is edited
+        # in place (https://sqlite.org/lang_altertable.html#otheralter).
+        sql = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'milestones'"
+        )).scalar()
+        updated, count = _PROJECT_FK.subn(r"\1 ON DELETE CASCADE", sql)
+        if count != 1:
+            raise RuntimeError("Cannot find the milestones.project_id foreign key to update")
+        version = connection.execute(text("PRAGMA schema_version")).scalar()
+        connection.execute(text("PRAGMA writable_schema = ON"))
+        connection.execute(
+            text("UPDATE sqlite_master SET sql = :sql WHERE type = 'table' AND name = 'milestones'"),
+            {"sql": updated}
+        )
+        connection.execute(text(f"PRAGMA schema_version = {version + 1}"))
+        connection.execute(text("PRAGMA writable_schema = OFF"))
+
+
+def _online(connection: Connection) -> bool:
+    return False
+
+
+# (name, step(connection), needs_operator(connection)) run in order after create_all
+MIGRATIONS = [
+    ("cascade_milestone_project_fk", cascade_milestone_project_fk, _online),
+    ("partition_milestones_by_fiscal_year", partition_milestones, partitioning_needs_operator),
+]
+
+
+def schema_fingerprint(metadata=Base.metadata) -> str:
+    """Stable hash of every table, column, constraint and index in the models,
+    plus the migration list"""
+    parts = [f"migration {name}" for name, _, _ in MIGRATIONS]
+    for table in metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            parts.append(
+                f"  {column.name} {column.type!r} nullable={column.nullable} "
+                f"pk={column.primary_key} fk={sorted(fk.target_fullname for fk in column.foreign_keys)}"
+            )
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            parts.append(f"  index {index.name} {[c.name for c in index.columns]} unique={index.unique}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+SCHEMA_VERSION = schema_fingerprint()
+
+
+def applied_version(bind: Engine = engine):
+    """Version recorded in the database, or None for a fresh/unversioned one"""
+    try:
+        with bind.connect() as connection:
+            return connection.execute(select(SchemaVersion.version)).scalar()
+    except DBAPIError:
+        # schema_version does not exist yet
+        return None
+
+
+def ensure_schema(bind: Engine = engine, maintenance: bool = False) -> str:
+    """Create whatever is missing if the models changed; returns what happened.
+
+    Steps that need an operator only run with maintenance=True; otherwise
+    they are reported as "needs maintenance: <names>".
+    """
+    if applied_version(bind) == SCHEMA_VERSION:
+        return "up to date"
+
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+            SchemaVersion.__table__.create(connection, checkfirst=True)
+            # Another worker may have finished while we waited for the lock
+            if connection.execute(select(SchemaVersion.version)).scalar() == SCHEMA_VERSION:
+                return "up to date"
+
+        Base.metadata.create_all(bind=connection)
+        deferred = []
+        for name, step, needs_operator in MIGRATIONS:
+            if not maintenance and needs_operator(connection):
+                deferred.append(name)
+                continue
+            step(connection)
+        if deferred:
+            # Left unrecorded so every boot checks (and warns) again
+            return f"needs maintenance: {', '.join(deferred)}"
+        connection.execute(delete(SchemaVersion))
+        connection.execute(insert(SchemaVersion).values(version=SCHEMA_VERSION))
+
+    return "updated"
+
+
+if __name__ == "__main__":
+    print(f"✅ Schema {ensure_schema(maintenance=True)} ({SCHEMA_VERSION[:12]})")
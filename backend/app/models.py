@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime, ForeignKey, Enum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -57,23 +57,160 @@ class Project(Base):
     
     # Relationships
     creator = relationship("User", back_populates="projects")
-    milestones = relationship("Milestone", back_populates="project", cascade="all, delete-orphan")
+    # Child rows are removed by the ON DELETE CASCADE on milestones.project_id,
+    # so deleting a project never loads its milestones into the session
+    milestones = relationship(
+        "Milestone",
+        back_populates="project",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
 
 class Milestone(Base):
+    """On PostgreSQL this table is range-partitioned by created_at per fiscal
+    year (app.partitions); the database primary key is then (id, created_at)"""
     __tablename__ = "milestones"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), index=True)
     title = Column(String, nullable=False)
     description = Column(String)
     requested_amount = Column(Float, nullable=False)
-    status = Column(Enum(MilestoneStatus), default=MilestoneStatus.PENDING)
-    contractor_id = Column(Integer, ForeignKey("users.id"))
-    auditor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(Enum(MilestoneStatus), default=MilestoneStatus.PENDING, index=True)
+    contractor_id = Column(Integer, ForeignKey("users.id"), index=True)
+    auditor_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    # Partition key: must be set on every row
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     approved_at = Column(DateTime, nullable=True)
     
     # Relationships
     project = relationship("Project", back_populates="milestones")
     contractor = relationship("User", foreign_keys=[contractor_id], back_populates="contractor_milestones")
-    auditor = relationship("User", foreign_keys=[auditor_id], back_populates="auditor_milestones")
\ No newline at end of file
+    auditor = relationship("User", foreign_keys=[auditor_id], back_populates="auditor_milestones")
+
+class MilestoneClaim(Base):
+    """Time-limited lease an auditor holds on a PENDING milestone"""
+    __tablename__ = "milestone_claims"
+
+    milestone_id = Column(Integer, ForeignKey("milestones.id", ondelete="CASCADE"), primary_key=True)
+    auditor_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    claimed_at = Column(DateTime, default=datetime.utcnow)
+    lease_expires_at = Column(DateTime, nullable=False, index=True)
+
+class MilestoneRiskScore(Base):
+    """Precomputed review priority for a PENDING milestone (see app.risk)"""
+    __tablename__ = "milestone_risk_scores"
+
+    milestone_id = Column(Integer, ForeignKey("milestones.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False, index=True)
+    amount_ratio = Column(Float, nullable=False)
+    budget_pressure = Column(Float, nullable=False)
+    contractor_flag_rate = Column(Float, nullable=False)
+    contractor_novelty = Column(Float, nullable=False)
+    scored_at = Column(DateTime, default=datetime.utcnow)
+
+# =========================================================
+# ARCHIVE (COLD) TABLES
+# =========================================================
+# COMPLETED projects and their milestones are moved here by app.archive so the
+# hot tables only hold active work. Ids are preserved from the hot tables.
+class ArchivedProject(Base):
+    __tablename__ = "projects_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False)
+    description = Column(String)
+    budget = Column(Float, nullable=False)
+    status = Column(Enum(ProjectStatus), nullable=False)
+    creator_id = Column(Integer, ForeignKey("users.id"), index=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedMilestone(Base):
+    __tablename__ = "milestones_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    project_id = Column(Integer, ForeignKey("projects_archive.id", ondelete="CASCADE"), index=True)
+    title = Column(String, nullable=False)
+    description = Column(String)
+    requested_amount = Column(Float, nullable=False)
+    status = Column(Enum(MilestoneStatus), nullable=False)
+    contractor_id = Column(Integer, ForeignKey("users.id"))
+    auditor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime)
+    approved_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+# =========================================================
+# CHANGE FEED
+# =========================================================
+class EntityChange(Base):
+    """One committed write to a user, project or milestone, in commit order"""
+    __tablename__ = "entity_changes"
+    # Never reuse sequence values on SQLite, even after compaction empties the table
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ChangeLogCompaction(Base):
+    """Compaction runs; cursors at or below horizon_seq can no longer be served"""
+    __tablename__ = "change_log_compactions"
+
+    id = Column(Integer, primary_key=True)
+    horizon_seq = Column(BigInteger, nullable=False)
+    removed = Column(Integer, nullable=False)
+    compacted_at = Column(DateTime, default=datetime.utcnow)
+
+
+# =========================================================
+# IDEMPOTENCY
+# =========================================================
+class IdempotencyKey(Base):
+    """Idempotency-Key of a create request, committed with the row it created"""
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(32), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    # JSON response; NULL only inside the transaction that reserved the key
+    response = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# =========================================================
+# BACKGROUND TASKS
+# =========================================================
+class BackgroundTask(Base):
+    """Follow-up job enqueued in a request's transaction (see app.tasks)"""
+    __tablename__ = "background_tasks"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    project_id = Column(Integer, nullable=True)
+    # Set while queued so the same job is only queued once; cleared when a
+    # worker picks it up, so writes during a run queue a fresh job
+    coalesce_key = Column(String(128), unique=True, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    locked_until = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# =========================================================
+# SCHEMA VERSION
+# =========================================================
+class SchemaVersion(Base):
+    """Fingerprint of the models the database schema was last brought up to"""
+    __tablename__ = "schema_version"
+
+    version = Column(String(64), primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,335 @@
+"""Entity change notifications shared between workers.
+
+Session hooks collect every User/Project/Milestone row written in a
+transaction and append them to the entity_changes log before commit (read by
+the /changes feed). On Postgres the same transaction issues NOTIFY, so other
+workers hear about a write exactly when it commits. A background listener in
+every other worker receives them and invalidates its local copies. The
+writing worker applies the events to its own caches after commit. Tests and SQLite setups use the in-memory
+bus, which delivers synchronously to every bus attached to the same peers list.
+"""
+import json
+import os
+import select
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from collections import defaultdict
+from typing import Callable, List, Optional
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import Session
+
+from .cache import entity_cache
+from .database import SessionLocal, engine
+from .models import EntityChange, Milestone, Project, User
+
+CHANGE_NOTIFY_CHANNEL = os.getenv("CHANGE_NOTIFY_CHANNEL", "govichain_changes")
+CHANGE_NOTIFY_BACKEND = os.getenv(
+    "CHANGE_NOTIFY_BACKEND",
+    "postgres" if engine.dialect.name == "postgresql" else "memory"
+)
+# NOTIFY payloads are limited to 8000 bytes; stay well below it
+MAX_PAYLOAD_BYTES = 7000
+
+ENTITY_KINDS = {User: "user", Project: "project", Milestone: "milestone"}
+
+_PENDING_KEY = "entity_changes"
+_SENT_KEY = "entity_changes_sent"
+
+# Arbitrary constant identifying the change-log advisory lock
+CHANGE_LOG_LOCK_ID = 740_035
+
+
+# =========================================================
+# BUSES
+# =========================================================
+class ChangeBus(ABC):
+    """Delivers change events to local subscribers and to other workers"""
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._handlers: List[tuple] = []
+
+    def subscribe(self, handler: Callable = None, local_only: bool = False):
+        """Register handler(events); local_only handlers skip other workers' events"""
+        def register(handler):
+            self._handlers.append((handler, local_only))
+            return handler
+        return register(handler) if handler is not None else register
+
+    def publish(self, events: List[dict], sent: bool = False):
+        """Deliver committed events; sent=True when send_in_transaction already
+        queued them for the other workers"""
+        if not events:
+            return
+        self.dispatch(events)
+        if not sent:
+            self._send(events)
+
+    def send_in_transaction(self, session: Session, events: List[dict]) -> bool:
+        """Queue events for other workers inside session's transaction, so they
+        are delivered exactly when it commits. False if the bus cannot."""
+        return False
+
+    def dispatch(self, events: List[dict], remote: bool = False):
+        for handler, local_only in self._handlers:
+            if remote and local_only:
+                continue
+            try:
+                handler(events)
+            except Exception as e:
+                print(f"⚠️ Change handler {handler.__name__} failed: {e}")
+
+    @abstractmethod
+    def _send(self, events: List[dict]):
+        """Deliver events to the other workers"""
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class InMemoryChangeBus(ChangeBus):
+    """Stand-in for NOTIFY: every bus sharing ``peers`` acts as one worker"""
+
+    def __init__(self, peers: Optional[list] = None):
+        super().__init__()
+        self.peers = peers if peers is not None else []
+        self.peers.append(self)
+
+    def _send(self, events: List[dict]):
+        for peer in self.peers:
+            if peer is not self:
+                peer.dispatch(events, remote=True)
+
+
+class PostgresChangeBus(ChangeBus):
+    """Publishes with pg_notify and listens on a dedicated connection"""
+
+    def __init__(self, channel: str = CHANGE_NOTIFY_CHANNEL, bind=engine):
+        super().__init__()
+        self.channel = channel
+        self.engine = bind
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _payloads(self, events: List[dict]):
+        batch = []
+        for e in events:
+            candidate = batch + [e]
+            payload = json.dumps({"origin": self.origin, "events": candidate})
+            if batch and len(payload) > MAX_PAYLOAD_BYTES:
+                yield json.dumps({"origin": self.origin, "events": batch})
+                batch = [e]
+            else:
+                batch = candidate
+        if batch:
+            yield json.dumps({"origin": self.origin, "events": batch})
+
+    def _notify(self, connection, events: List[dict]):
+        for payload in self._payloads(events):
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": payload}
+            )
+
+    def send_in_transaction(self, session: Session, events: List[dict]) -> bool:
+        # NOTIFY is transactional: queued now, delivered by the commit itself
+        self._notify(session, events)
+        return True
+
+    def _send(self, events: List[dict]):
+        try:
+            with self.engine.begin() as connection:
+                self._notify(connection, events)
+        except Exception as e:
+            # Peers fall back to cache TTL expiry if a notification is lost
+            print(f"⚠️ Could not publish change notification: {e}")
+
+    def _handle(self, payload: str):
+        message = json.loads(payload)
+        if message.get("origin") == self.origin:
+            return
+        self.dispatch(message["events"], remote=True)
+
+    def _listen(self):
+        backoff = 1
+        connected_before = False
+        while not self._stop.is_set():
+            raw = None
+            try:
+                # Detached from the pool so LISTEN never holds a pooled slot
+                raw = self.engine.raw_connection()
+                conn = raw.driver_connection
+                raw.detach()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                backoff = 1
+
+                if connected_before:
+                    # Events sent while we were disconnected are lost
+                    self.dispatch([{"entity": "*", "id": None, "op": "resync"}], remote=True)
+                connected_before = True
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"⚠️ Change listener error, reconnecting in {backoff}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="change-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def create_change_bus(backend: str = CHANGE_NOTIFY_BACKEND) -> ChangeBus:
+    if backend == "postgres":
+        return PostgresChangeBus()
+    return InMemoryChangeBus()
+
+
+change_bus = create_change_bus()
+
+
+# =========================================================
+# SESSION HOOKS
+# =========================================================
+def record_change(db: Session, entity: str, op: str, *entity_ids: int):
+    """Queue changes the ORM cannot see (bulk/cascade deletes) for this commit"""
+    pending = db.info.setdefault(_PENDING_KEY, {})
+    for entity_id in entity_ids:
+        pending[(entity, entity_id)] = op
+
+
+def pending_changes(db: Session) -> dict:
+    """{(entity, id): op} collected so far in the session's transaction"""
+    return db.info.get(_PENDING_KEY, {})
+
+
+def _kind(obj) -> Optional[str]:
+    for model, kind in ENTITY_KINDS.items():
+        if isinstance(obj, model):
+            return kind
+    return None
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for op, objects in (
+        ("insert", session.new),
+        ("update", session.dirty),
+        ("delete", session.deleted)
+    ):
+        for obj in objects:
+            kind = _kind(obj)
+            if kind is None:
+                continue
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            key = (kind, obj.id)
+            # An insert followed by updates in the same transaction is still an insert
+            if pending.get(key) == "insert" and op == "update":
+                continue
+            pending[key] = op
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _write_change_log(session: Session):
+    """Append the transaction's changes to entity_changes for the /changes feed"""
+    # Flush first so _collect_changes has seen every pending write
+    session.flush()
+    changes = pending_changes(session)
+    if not changes:
+        return
+
+    if session.get_bind().dialect.name == "postgresql":
+        # Sequence values are drawn while holding this lock until commit, so
+        # seq order equals commit order and readers never skip an entry that
+        # commits late.
+        session.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK_ID}
+        )
+
+    now = datetime.utcnow()
+    session.execute(insert(EntityChange), [
+        {"entity": entity, "entity_id": entity_id, "op": op, "changed_at": now}
+        for (entity, entity_id), op in changes.items()
+    ])
+
+    # Other workers are notified by this same commit, on this connection
+    if change_bus.send_in_transaction(session, _events(changes)):
+        session.info[_SENT_KEY] = True
+
+
+def _events(changes: dict) -> List[dict]:
+    return [
+        {"entity": entity, "id": entity_id, "op": op}
+        for (entity, entity_id), op in changes.items()
+    ]
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_changes(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    sent = session.info.pop(_SENT_KEY, False)
+    if pending:
+        change_bus.publish(_events(pending), sent=sent)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_SENT_KEY, None)
+
+
+# =========================================================
+# LOCAL CACHE INVALIDATION
+# =========================================================
+@change_bus.subscribe
+def invalidate_entity_cache(events: List[dict]):
+    ids_by_kind = defaultdict(list)
+    for e in events:
+        if e["op"] == "resync":
+            entity_cache.clear_local()
+            return
+        if e["op"] != "insert":
+            ids_by_kind[e["entity"]].append(e["id"])
+
+    for kind, ids in ids_by_kind.items():
+        entity_cache.invalidate(kind, *ids)
+
+
+def start_change_listener():
+    change_bus.start()
+
+
+def stop_change_listener():
+    change_bus.stop()
@@ -0,0 +1,250 @@
+"""Range partitioning of ``milestones`` by fiscal year (PostgreSQL only).
+
+The ``partition_milestones`` migration (see app.migrations) turns the heap
+table into ``milestones PARTITION BY RANGE (created_at)`` with one
+``milestones_fy<year>`` partition per fiscal year. Fiscal year 2025 runs
+from FISCAL_YEAR_START_MONTH 2025 up to the same month of 2026. Converting a
+table that already holds rows rewrites all of it under an exclusive lock, so
+startup leaves that to an operator (``python -m app.migrations``).
+
+PostgreSQL requires the partition key in every unique constraint, so the
+primary key becomes (id, created_at). Foreign keys that pointed at
+milestones.id (claims, risk scores) are replaced by an AFTER DELETE trigger
+that removes the dependent rows.
+
+Future partitions are created at startup and by the maintenance command.
+Old fiscal years can be detached once all their projects have been archived
+(app.archive), so budgets, progress and dashboards never lose rows of a live
+project. Detached years stay as standalone tables that hot queries no longer
+plan or scan:
+
+    python -m app.partitions maintain --ahead 2
+    python -m app.partitions detach --older-than-years 5
+    python -m app.partitions list
+
+On other databases every function here is a no-op.
+"""
+import argparse
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .database import engine
+from .models import Milestone
+
+FISCAL_YEAR_START_MONTH = int(os.getenv("FISCAL_YEAR_START_MONTH", 4))
+MILESTONE_PARTITIONS_AHEAD = int(os.getenv("MILESTONE_PARTITIONS_AHEAD", 2))
+PARTITION_PREFIX = "milestones_fy"
+
+
+# =========================================================
+# FISCAL YEARS
+# =========================================================
+def fiscal_year(moment: datetime) -> int:
+    return moment.year if moment.month >= FISCAL_YEAR_START_MONTH else moment.year - 1
+
+
+def fiscal_year_bounds(year: int) -> Tuple[datetime, datetime]:
+    """[start, end) of a fiscal year"""
+    return (
+        datetime(year, FISCAL_YEAR_START_MONTH, 1),
+        datetime(year + 1, FISCAL_YEAR_START_MONTH, 1)
+    )
+
+
+def _supported(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if not _supported(connection):
+        return False
+    return connection.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('milestones')"
+    )).scalar() is True
+
+
+def list_partitions(connection: Connection) -> List[dict]:
+    """Attached fiscal-year partitions, oldest first"""
+    if not is_partitioned(connection):
+        return []
+    rows = connection.execute(text("""
+        SELECT c.relname, c.reltuples::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'milestones'::regclass
+        ORDER BY c.relname
+    """)).all()
+    return [
+        {"name": name, "fiscal_year": int(name[len(PARTITION_PREFIX):]), "estimated_rows": max(rows_estimate, 0)}
+        for name, rows_estimate in rows
+        if name.startswith(PARTITION_PREFIX)
+    ]
+
+
+def partitioning_needs_operator(connection: Connection) -> bool:
+    """True while milestones is an unpartitioned table that already has rows"""
+    if not _supported(connection) or is_partitioned(connection):
+        return False
+    return connection.execute(text("SELECT EXISTS (SELECT 1 FROM milestones)")).scalar()
+
+
+def _create_partition(connection: Connection, year: int):
+    start, end = fiscal_year_bounds(year)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {PARTITION_PREFIX}{year} PARTITION OF milestones "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+# =========================================================
+# MIGRATION
+# =========================================================
+def partition_milestones(connection: Connection):
+    """Convert the milestones heap table into a fiscal-year partitioned table.
+
+    Idempotent; runs inside the schema migration transaction.
+    """
+    if not _supported(connection) or is_partitioned(connection):
+        return
+
+    sequence = connection.execute(
+        text("SELECT pg_get_serial_sequence('milestones', 'id')")
+    ).scalar()
+
+    # Nothing can reference milestones(id) alone once it is partitioned
+    connection.execute(text("""
+        DO $$
+        DECLARE r record;
+        BEGIN
+            FOR r IN
+                SELECT conrelid::regclass AS tbl, conname FROM pg_constraint
+                WHERE contype = 'f' AND confrelid = 'milestones'::regclass
+                  AND conrelid <> 'milestones'::regclass
+            LOOP
+                EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', r.tbl, r.conname);
+            END LOOP;
+        END $$
+    """))
+
+    connection.execute(text("ALTER TABLE milestones RENAME TO milestones_unpartitioned"))
+    connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    connection.execute(text(
+        "CREATE TABLE milestones (LIKE milestones_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+
+    connection.execute(text(
+        "UPDATE milestones_unpartitioned SET created_at = now() AT TIME ZONE 'utc' "
+        "WHERE created_at IS NULL"
+    ))
+    oldest = connection.execute(text("SELECT min(created_at) FROM milestones_unpartitioned")).scalar()
+    first_year = fiscal_year(oldest or datetime.utcnow())
+    last_year = fiscal_year(datetime.utcnow()) + MILESTONE_PARTITIONS_AHEAD
+    for year in range(first_year, last_year + 1):
+        _create_partition(connection, year)
+
+    connection.execute(text("INSERT INTO milestones SELECT * FROM milestones_unpartitioned"))
+    connection.execute(text("DROP TABLE milestones_unpartitioned"))
+    connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY milestones.id"))
+
+    connection.execute(text("ALTER TABLE milestones ALTER COLUMN created_at SET NOT NULL"))
+    connection.execute(text("ALTER TABLE milestones ADD PRIMARY KEY (id, created_at)"))
+    connection.execute(text(
+        "ALTER TABLE milestones ADD FOREIGN KEY (project_id) "
+        "REFERENCES projects (id) ON DELETE CASCADE"
+    ))
+    connection.execute(text("ALTER TABLE milestones ADD FOREIGN KEY (contractor_id) REFERENCES users (id)"))
+    connection.execute(text("ALTER TABLE milestones ADD FOREIGN KEY (auditor_id) REFERENCES users (id)"))
+    # Partitioned indexes: every current and future partition gets its own
+    for index in Milestone.__table__.indexes:
+        index.create(connection)
+
+    # Stands in for ON DELETE CASCADE from the tables that referenced milestones(id)
+    connection.execute(text("""
+        CREATE OR REPLACE FUNCTION milestones_delete_dependents() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM milestone_claims WHERE milestone_id = OLD.id;
+            DELETE FROM milestone_risk_scores WHERE milestone_id = OLD.id;
+            RETURN OLD;
+        END $$ LANGUAGE plpgsql
+    """))
+    connection.execute(text(
+        "CREATE TRIGGER milestones_delete_dependents AFTER DELETE ON milestones "
+        "FOR EACH ROW EXECUTE FUNCTION milestones_delete_dependents()"
+    ))
+
+
+# =========================================================
+# MAINTENANCE
+# =========================================================
+def ensure_future_partitions(connection: Connection, ahead: int = MILESTONE_PARTITIONS_AHEAD) -> List[int]:
+    """Create partitions for the current fiscal year and `ahead` more; returns new years"""
+    if not is_partitioned(connection):
+        return []
+
+    existing = {p["fiscal_year"] for p in list_partitions(connection)}
+    current = fiscal_year(datetime.utcnow())
+    created = [year for year in range(current, current + ahead + 1) if year not in existing]
+    for year in created:
+        _create_partition(connection, year)
+    return created
+
+
+def detach_partitions(connection: Connection, older_than_years: int) -> List[str]:
+    """Detach fiscal years older than the cutoff once their projects are archived.
+
+    Partitions that still hold milestones of a project in the hot projects
+    table are left attached: its budget check, progress and dashboard
+    figures read them.
+    """
+    if not is_partitioned(connection):
+        return []
+
+    cutoff = fiscal_year(datetime.utcnow()) - older_than_years
+    detached = []
+    for partition in list_partitions(connection):
+        if partition["fiscal_year"] >= cutoff:
+            continue
+        name = partition["name"]
+        live = connection.execute(text(f"""
+            SELECT EXISTS (
+                SELECT 1 FROM {name} m JOIN projects p ON p.id = m.project_id
+            )
+        """)).scalar()
+        if live:
+            print(f"⚠️ Keeping {name} attached: archive its projects first (python -m app.archive)")
+            continue
+        connection.execute(text(f"ALTER TABLE milestones DETACH PARTITION {name}"))
+        detached.append(name)
+    return detached
+
+
+def maintain(ahead: int = MILESTONE_PARTITIONS_AHEAD, older_than_years: Optional[int] = None) -> dict:
+    with engine.begin() as connection:
+        created = ensure_future_partitions(connection, ahead)
+        detached = detach_partitions(connection, older_than_years) if older_than_years else []
+    return {"created": created, "detached": detached}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage milestone partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    maintain_parser = commands.add_parser("maintain", help="create upcoming fiscal years")
+    maintain_parser.add_argument("--ahead", type=int, default=MILESTONE_PARTITIONS_AHEAD)
+    detach_parser = commands.add_parser("detach", help="detach finished fiscal years")
+    detach_parser.add_argument("--older-than-years", type=int, required=True)
+    commands.add_parser("list", help="show attached partitions")
+    args = parser.parse_args()
+
+    if args.command == "maintain":
+        print(f"✅ Partitions: {maintain(args.ahead)}")
+    elif args.command == "detach":
+        print(f"✅ Partitions: {maintain(older_than_years=args.older_than_years)}")
+    else:
+        with engine.connect() as connection:
+            for partition in list_partitions(connection):
+                print(f"{partition['name']}  ~{partition['estimated_rows']} rows")
@@ -0,0 +1,207 @@
+"""Token-bucket admission control.
+
+Authenticated routes draw from two buckets per request: the caller's role
+budget (keyed by the token's subject) and, for routes with their own budget, a per-user
+bucket for that route. Auth routes are keyed by client IP. A request that
+finds an empty bucket gets 429 with Retry-After. The check only decodes the
+JWT, so a throttled request is turned away before it takes a database
+connection.
+
+Buckets live in process memory by default; point RATE_LIMIT_URL at Redis so
+all workers share them. Budgets are ``rate/burst`` (tokens per second and
+bucket size) and can be overridden per role or per route:
+
+    RATE_LIMITS="role:AUDITOR=30/120,GET /dashboard/stats=1/5"
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from .auth import decode_access_token, oauth2_scheme
+from .cache import CACHE_KEY_PREFIX, CACHE_URL
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", CACHE_URL)
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", 100000))
+# Behind a reverse proxy the client address is the proxy's
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+
+# (tokens per second, burst)
+ROLE_BUDGETS = {
+    "GOVERNMENT": (10, 60),
+    "CONTRACTOR": (10, 60),
+    "AUDITOR": (20, 120),
+}
+ROUTE_BUDGETS = {
+    # Per client IP
+    "POST /auth/login": (0.2, 10),
+    "POST /auth/register": (0.05, 5),
+    # Per user, on top of the role budget
+    "GET /projects/": (2, 10),
+    "GET /projects/filter/by-status": (2, 10),
+    "GET /milestones/filter/by-status": (2, 10),
+    "GET /milestones/my-milestones": (2, 10),
+    "GET /users/": (2, 10),
+    "GET /dashboard/stats": (0.5, 5),
+}
+
+
+def _parse_budgets(value: str):
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, budget = item.rpartition("=")
+        rate, _, burst = budget.partition("/")
+        key = key.strip()
+        target = ROLE_BUDGETS if key.startswith("role:") else ROUTE_BUDGETS
+        target[key.removeprefix("role:")] = (float(rate), float(burst))
+
+
+_parse_budgets(os.getenv("RATE_LIMITS", ""))
+
+
+# =========================================================
+# BACKENDS
+# =========================================================
+class MemoryBucketBackend:
+    """Buckets in process memory; least recently used ones are evicted"""
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until one is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class RedisBucketBackend:
+    """Buckets shared by all workers; each check is one atomic script call"""
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str = RATE_LIMIT_URL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "RATE_LIMIT_URL points at Redis but the 'redis' package is not installed"
+                ) from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        allowed, tokens = self._script(keys=[key], args=[rate, burst, time.time()])
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / rate
+
+
+def create_bucket_backend(url: str = RATE_LIMIT_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBucketBackend(url)
+    return MemoryBucketBackend()
+
+
+# =========================================================
+# LIMITER
+# =========================================================
+class RateLimiter:
+    def __init__(self, backend, enabled: bool = RATE_LIMIT_ENABLED):
+        self.backend = backend
+        self.enabled = enabled
+
+    def _key(self, *parts) -> str:
+        return ":".join([CACHE_KEY_PREFIX, "rl", *map(str, parts)])
+
+    def _take(self, key: str, budget: Optional[tuple]) -> float:
+        """Seconds to wait before retrying, or 0 when admitted"""
+        if budget is None:
+            return 0.0
+        try:
+            allowed, retry_after = self.backend.take(key, *budget)
+        except Exception as e:
+            # A broken shared backend must not take the API down with it
+            print(f"⚠️ Rate limiter unavailable, admitting request: {e}")
+            return 0.0
+        return 0.0 if allowed else retry_after
+
+    def check(self, route: str, principal: str, role: Optional[str] = None):
+        if not self.enabled:
+            return
+
+        # Route budgets are the tighter ones; check them first so a rejected
+        # request does not also drain the role budget
+        retry_after = self._take(self._key(route, principal), ROUTE_BUDGETS.get(route))
+        if not retry_after and role is not None:
+            retry_after = self._take(self._key("role", principal), ROLE_BUDGETS.get(role))
+
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+
+rate_limiter = RateLimiter(create_bucket_backend())
+
+
+def _route_key(request: Request) -> str:
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', request.url.path)}"
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# =========================================================
+# DEPENDENCIES
+# =========================================================
+def limit_by_user(request: Request, token: str = Depends(oauth2_scheme)):
+    """Router dependency for authenticated routes; runs before get_db"""
+    token_data = decode_access_token(token)
+    role = token_data.role.value if token_data.role else None
+    rate_limiter.check(_route_key(request), f"user:{token_data.username}", role)
+
+
+def limit_by_client(request: Request):
+    """Router dependency for unauthenticated (auth) routes"""
+    rate_limiter.check(_route_key(request), f"ip:{client_ip(request)}")
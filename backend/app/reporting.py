@@ -0,0 +1,314 @@
+"""Columnar snapshots for offline reporting.
+
+Exports users, projects and milestones to Parquet under SNAPSHOT_DIR,
+partitioned by the year rows were created, and runs reports over those files
+with embedded DuckDB so analytical queries never touch the OLTP database.
+
+Exports are incremental: the watermark is the change-feed cursor
+(app.changes), which covers every write including milestone approvals and
+flags that leave no timestamp behind. Each run appends the current version
+of changed rows plus tombstones for deleted ones; the DuckDB views pick the
+latest version per id. When the stored watermark is older than the change
+log horizon the export falls back to a full rewrite. A full export is
+written next to the live snapshot and swapped in once complete, so a failed
+run leaves the previous snapshot usable.
+
+Archived projects and milestones (app.archive) stay in the snapshot: rows
+are read from the archive tables as well, with archived_at set, so archiving
+is exported as an update rather than a delete.
+
+    cd backend
+    python -m app.reporting export            # incremental (full on first run)
+    python -m app.reporting export --full
+    python -m app.reporting quarterly
+    python -m app.reporting query "SELECT status, count(*) FROM milestones GROUP BY 1"
+
+Needs the optional ``pyarrow`` and ``duckdb`` packages
+(requirements-reporting.txt).
+"""
+import argparse
+import enum
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import BigInteger, DateTime, Float, Integer, select
+from sqlalchemy.orm import Session
+
+from .changes import compaction_horizon, current_cursor
+from .database import SessionLocal
+from .models import ArchivedMilestone, ArchivedProject, EntityChange, Milestone, Project, User
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "snapshots"))
+EXPORT_CHUNK_SIZE = 5000
+
+# Source tables (hot first, then archive) and exported columns per table;
+# password hashes never leave the database
+EXPORTS = {
+    "users": ((User,), "user", ["id", "email", "username", "role", "created_at"]),
+    "projects": ((Project, ArchivedProject), "project", [
+        "id", "name", "description", "budget", "status",
+        "creator_id", "created_at", "updated_at", "archived_at"
+    ]),
+    "milestones": ((Milestone, ArchivedMilestone), "milestone", [
+        "id", "project_id", "title", "description", "requested_amount", "status",
+        "contractor_id", "auditor_id", "created_at", "approved_at", "archived_at"
+    ]),
+}
+
+
+def _require(module: str):
+    try:
+        return __import__(module)
+    except ImportError as e:
+        raise RuntimeError(
+            f"Snapshot reporting needs the '{module}' package "
+            "(pip install -r requirements-reporting.txt)"
+        ) from e
+
+
+# =========================================================
+# EXPORT
+# =========================================================
+def _arrow_schema(models, columns):
+    pa = _require("pyarrow")
+    fields = []
+    for name in columns:
+        column_type = next(m.__table__.c[name].type for m in models if name in m.__table__.c)
+        if isinstance(column_type, (Integer, BigInteger)):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    fields += [pa.field("_seq", pa.int64()), pa.field("created_year", pa.int32())]
+    return pa.schema(fields)
+
+
+def _row(obj, columns, seq):
+    row = {}
+    for name in columns:
+        # Hot rows have no archived_at
+        value = getattr(obj, name, None)
+        if isinstance(value, enum.Enum):
+            value = value.value
+        row[name] = value
+    row["_seq"] = seq
+    row["created_year"] = obj.created_at.year if obj.created_at else 0
+    return row
+
+
+def _write(table_dir: Path, schema, rows, name: str):
+    """Write one chunk of rows; name must be unique within the export run"""
+    pa = _require("pyarrow")
+    import pyarrow.parquet as pq
+
+    if not rows:
+        return 0
+    table = pa.Table.from_pylist(rows, schema=schema)
+    pq.write_to_dataset(
+        table,
+        root_path=str(table_dir),
+        partition_cols=["created_year"],
+        basename_template=f"part-{name}-{{i}}.parquet"
+    )
+    return len(rows)
+
+
+def _write_deletes(table_dir: Path, ids, seq):
+    pa = _require("pyarrow")
+    import pyarrow.parquet as pq
+
+    if not ids:
+        return 0
+    deletes_dir = table_dir.parent / f"{table_dir.name}_deletes"
+    deletes_dir.mkdir(parents=True, exist_ok=True)
+    table = pa.table({
+        "id": pa.array(sorted(ids), pa.int64()),
+        "_seq": pa.array([seq] * len(ids), pa.int64())
+    })
+    pq.write_table(table, str(deletes_dir / f"part-{seq}.parquet"))
+    return len(ids)
+
+
+def _state_path(snapshot_dir: Path) -> Path:
+    return snapshot_dir / "_state.json"
+
+
+def export_snapshot(db: Session, snapshot_dir: Path = SNAPSHOT_DIR, full: bool = False) -> dict:
+    """Write changed rows since the last export; returns rows written per table"""
+    if db.get_bind().dialect.name == "postgresql":
+        # One consistent snapshot for the cursor and every table read
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    state_path = _state_path(snapshot_dir)
+    since = json.loads(state_path.read_text())["seq"] if state_path.exists() else None
+    upto = current_cursor(db)
+
+    # Nothing exported yet, or the change log was compacted past our watermark
+    if since is None or since < compaction_horizon(db):
+        full = True
+
+    # A full export is staged here and swapped in only once every table is written
+    staging = snapshot_dir / f"_full-{upto}"
+    if full:
+        for leftover in snapshot_dir.glob("_full-*"):
+            shutil.rmtree(leftover, ignore_errors=True)
+
+    written = {}
+    for table_name, (models, entity, columns) in EXPORTS.items():
+        table_dir = (staging if full else snapshot_dir) / table_name
+        schema = _arrow_schema(models, columns)
+        # Every chunk goes to its own file as soon as it is read
+        chunks = 0
+        count = 0
+
+        if full:
+            for model in models:
+                batches = db.scalars(
+                    select(model).order_by(model.id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+                ).partitions()
+                for batch in batches:
+                    count += _write(
+                        table_dir, schema, [_row(obj, columns, upto) for obj in batch], f"{upto}-{chunks}"
+                    )
+                    chunks += 1
+            written[table_name] = count
+            continue
+
+        changed_ids = sorted(
+            entity_id for (entity_id,) in db.query(EntityChange.entity_id).filter(
+                EntityChange.entity == entity,
+                EntityChange.seq > since,
+                EntityChange.seq <= upto
+            ).distinct()
+        )
+
+        deleted = set()
+        for start in range(0, len(changed_ids), EXPORT_CHUNK_SIZE):
+            # Ids found in neither the hot nor the archive table were deleted
+            missing = set(changed_ids[start:start + EXPORT_CHUNK_SIZE])
+            for model in models:
+                if not missing:
+                    break
+                objects = db.query(model).filter(model.id.in_(missing)).all()
+                missing -= {obj.id for obj in objects}
+                count += _write(
+                    table_dir, schema, [_row(obj, columns, upto) for obj in objects], f"{upto}-{chunks}"
+                )
+                chunks += 1
+            deleted |= missing
+
+        written[table_name] = count
+        written[f"{table_name}_deleted"] = _write_deletes(table_dir, deleted, upto)
+
+    db.rollback()
+
+    if full:
+        # From here until the new state is written, a crash must force the
+        # next run to export in full again
+        state_path.unlink(missing_ok=True)
+        for table_name in EXPORTS:
+            for name in (table_name, f"{table_name}_deletes"):
+                shutil.rmtree(snapshot_dir / name, ignore_errors=True)
+                if (staging / name).exists():
+                    (staging / name).rename(snapshot_dir / name)
+        shutil.rmtree(staging, ignore_errors=True)
+
+    state_tmp = state_path.with_suffix(".tmp")
+    state_tmp.write_text(json.dumps({
+        "seq": upto,
+        "exported_at": datetime.utcnow().isoformat()
+    }))
+    state_tmp.replace(state_path)
+    return written
+
+
+# =========================================================
+# QUERY
+# =========================================================
+def connect(snapshot_dir: Path = SNAPSHOT_DIR):
+    """DuckDB connection with users/projects/milestones views over the snapshot"""
+    duckdb = _require("duckdb")
+    conn = duckdb.connect()
+
+    for table_name in EXPORTS:
+        table_glob = snapshot_dir / table_name / "**" / "*.parquet"
+        deletes_glob = snapshot_dir / f"{table_name}_deletes" / "*.parquet"
+        if not list((snapshot_dir / table_name).glob("**/*.parquet")):
+            continue
+
+        latest = f"""
+            SELECT * EXCLUDE (_rn) FROM (
+                SELECT *, row_number() OVER (PARTITION BY id ORDER BY _seq DESC) AS _rn
+                FROM read_parquet('{table_glob}', hive_partitioning = true, union_by_name = true)
+            ) WHERE _rn = 1
+        """
+        if list(deletes_glob.parent.glob("*.parquet")):
+            latest = f"""
+                SELECT l.* FROM ({latest}) l
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM read_parquet('{deletes_glob}') d
+                    WHERE d.id = l.id AND d._seq >= l._seq
+                )
+            """
+        conn.execute(f"CREATE VIEW {table_name} AS {latest}")
+
+    return conn
+
+
+QUARTERLY_REPORT = """
+    SELECT
+        year(m.created_at) AS year,
+        quarter(m.created_at) AS quarter,
+        count(*) AS milestones,
+        count(*) FILTER (WHERE m.status = 'APPROVED') AS approved,
+        count(*) FILTER (WHERE m.status = 'FLAGGED') AS flagged,
+        count(*) FILTER (WHERE m.status = 'PENDING') AS pending,
+        sum(m.requested_amount) AS requested_amount,
+        sum(m.requested_amount) FILTER (WHERE m.status = 'APPROVED') AS approved_amount,
+        count(DISTINCT m.project_id) AS projects,
+        count(DISTINCT m.contractor_id) AS contractors
+    FROM milestones m
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+
+def _print(conn, sql: str):
+    result = conn.execute(sql)
+    headers = [d[0] for d in result.description]
+    print(" | ".join(headers))
+    for row in result.fetchall():
+        print(" | ".join("" if v is None else str(v) for v in row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parquet snapshots for offline reporting")
+    parser.add_argument("--snapshot-dir", default=str(SNAPSHOT_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write a snapshot")
+    export_parser.add_argument("--full", action="store_true")
+    commands.add_parser("quarterly", help="quarterly milestone report")
+    query_parser = commands.add_parser("query", help="run SQL over the snapshot")
+    query_parser.add_argument("sql")
+    args = parser.parse_args()
+
+    snapshot_dir = Path(args.snapshot_dir)
+    if args.command == "export":
+        db = SessionLocal()
+        try:
+            written = export_snapshot(db, snapshot_dir, args.full)
+        finally:
+            db.close()
+        print(f"✅ Snapshot written: {written}")
+    elif args.command == "quarterly":
+        _print(connect(snapshot_dir), QUARTERLY_REPORT)
+    else:
+        _print(connect(snapshot_dir), args.sql)
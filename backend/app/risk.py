@@ -0,0 +1,316 @@
+"""Batch risk scoring for PENDING milestones.
+
+Scores are precomputed into ``milestone_risk_scores`` so the auditor queue can
+simply ORDER BY score. Features for a whole batch come from three set-based
+queries; nothing is scored on the request path.
+
+Each worker marks affected milestones/projects dirty from its own change
+events and a background thread rescores them every
+RISK_SCORING_INTERVAL_SECONDS. Each tick also scores any PENDING milestone
+still missing a score. A full rescore runs from the backend directory:
+
+    python -m app.risk
+"""
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Milestone, MilestoneRiskScore, MilestoneStatus, Project
+from .notifications import change_bus
+
+RISK_SCORING_INTERVAL_SECONDS = float(os.getenv("RISK_SCORING_INTERVAL_SECONDS", 5))
+RISK_BATCH_SIZE = int(os.getenv("RISK_BATCH_SIZE", 1000))
+
+# Feature weights; each feature is normalised to 0..1 and the score to 0..100
+WEIGHTS = {
+    "amount_ratio": 0.35,
+    "budget_pressure": 0.15,
+    "contractor_flag_rate": 0.35,
+    "contractor_novelty": 0.15,
+}
+# Beta prior for the flag rate so a contractor with one flagged milestone is
+# not scored like a proven offender
+FLAG_PRIOR_FLAGGED = 1
+FLAG_PRIOR_DECIDED = 4
+
+# INSERT ... ON CONFLICT DO UPDATE replaces a milestone's previous score
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _clip(value: float, upper: float = 1.0) -> float:
+    return max(0.0, min(value, upper))
+
+
+def score_features(
+    requested: List[float],
+    budgets: List[float],
+    project_totals: List[float],
+    flagged: List[int],
+    approved: List[int]
+) -> dict:
+    """Column-wise scoring of a batch; every argument is one value per milestone"""
+    amount_ratio = [_clip(r / b) if b > 0 else 1.0 for r, b in zip(requested, budgets)]
+    budget_pressure = [
+        _clip(t / b, 1.5) / 1.5 if b > 0 else 1.0 for t, b in zip(project_totals, budgets)
+    ]
+    flag_rate = [
+        (f + FLAG_PRIOR_FLAGGED) / (f + a + FLAG_PRIOR_DECIDED)
+        for f, a in zip(flagged, approved)
+    ]
+    novelty = [1.0 / (1 + a) for a in approved]
+
+    score = [
+        round(100 * (
+            WEIGHTS["amount_ratio"] * ar
+            + WEIGHTS["budget_pressure"] * bp
+            + WEIGHTS["contractor_flag_rate"] * fr
+            + WEIGHTS["contractor_novelty"] * nv
+        ), 3)
+        for ar, bp, fr, nv in zip(amount_ratio, budget_pressure, flag_rate, novelty)
+    ]
+
+    return {
+        "score": score,
+        "amount_ratio": amount_ratio,
+        "budget_pressure": budget_pressure,
+        "contractor_flag_rate": flag_rate,
+        "contractor_novelty": novelty,
+    }
+
+
+def score_batch(db: Session, milestone_ids: Optional[List[int]] = None, after_id: int = 0) -> List[int]:
+    """Score PENDING milestones (the given ids, or the next batch after after_id).
+
+    Returns the ids scored. Does not commit.
+    """
+    query = db.query(
+        Milestone.id,
+        Milestone.project_id,
+        Milestone.contractor_id,
+        Milestone.requested_amount,
+        Project.budget
+    ).join(
+        Project, Project.id == Milestone.project_id
+    ).filter(Milestone.status == MilestoneStatus.PENDING)
+
+    if milestone_ids is not None:
+        query = query.filter(Milestone.id.in_(milestone_ids))
+    else:
+        query = query.filter(Milestone.id > after_id).order_by(Milestone.id).limit(RISK_BATCH_SIZE)
+
+    rows = query.all()
+    if not rows:
+        return []
+
+    ids, project_ids, contractor_ids, requested, budgets = map(list, zip(*rows))
+
+    project_totals = dict(db.query(
+        Milestone.project_id,
+        func.sum(Milestone.requested_amount)
+    ).filter(
+        Milestone.project_id.in_(set(project_ids))
+    ).group_by(Milestone.project_id).all())
+
+    history = {
+        contractor_id: (flagged or 0, approved or 0)
+        for contractor_id, flagged, approved in db.query(
+            Milestone.contractor_id,
+            func.sum(case((Milestone.status == MilestoneStatus.FLAGGED, 1), else_=0)),
+            func.sum(case((Milestone.status == MilestoneStatus.APPROVED, 1), else_=0))
+        ).filter(
+            Milestone.contractor_id.in_(set(contractor_ids))
+        ).group_by(Milestone.contractor_id).all()
+    }
+
+    features = score_features(
+        requested,
+        budgets,
+        [project_totals.get(p, 0) for p in project_ids],
+        [history.get(c, (0, 0))[0] for c in contractor_ids],
+        [history.get(c, (0, 0))[1] for c in contractor_ids]
+    )
+
+    now = datetime.utcnow()
+    # Workers scoring the same milestone concurrently must not collide on the
+    # primary key
+    stmt = _INSERTS[db.get_bind().dialect.name](MilestoneRiskScore)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MilestoneRiskScore.milestone_id],
+        set_={
+            name: stmt.excluded[name]
+            for name in list(features) + ["scored_at"]
+        }
+    )
+    db.execute(stmt, [
+        dict({name: values[i] for name, values in features.items()},
+             milestone_id=milestone_id, scored_at=now)
+        for i, milestone_id in enumerate(ids)
+    ])
+
+    return ids
+
+
+def rescore_all(db: Session) -> int:
+    """Rescore every PENDING milestone in batches and drop stale scores"""
+    total = 0
+    after_id = 0
+    while True:
+        ids = score_batch(db, after_id=after_id)
+        db.commit()
+        if not ids:
+            break
+        total += len(ids)
+        after_id = ids[-1]
+
+    pending = db.query(Milestone.id).filter(Milestone.status == MilestoneStatus.PENDING)
+    db.query(MilestoneRiskScore).filter(
+        MilestoneRiskScore.milestone_id.not_in(pending.scalar_subquery())
+    ).delete(synchronize_session=False)
+    db.commit()
+    return total
+
+
+def rescore_affected(db: Session, milestone_ids: set, project_ids: set) -> int:
+    """Rescore after writes: the milestones themselves, every pending milestone
+    of their contractors (whose history changed) and of touched projects"""
+    contractor_ids = set()
+    if milestone_ids:
+        contractor_ids = {
+            c for (c,) in db.query(Milestone.contractor_id).filter(
+                Milestone.id.in_(milestone_ids)
+            ).distinct()
+        }
+        # Decided (or deleted) milestones no longer need a score
+        db.query(MilestoneRiskScore).filter(
+            MilestoneRiskScore.milestone_id.in_(milestone_ids),
+            MilestoneRiskScore.milestone_id.not_in(
+                db.query(Milestone.id).filter(
+                    Milestone.id.in_(milestone_ids),
+                    Milestone.status == MilestoneStatus.PENDING
+                ).scalar_subquery()
+            )
+        ).delete(synchronize_session=False)
+
+    criteria = []
+    if milestone_ids:
+        criteria.append(Milestone.id.in_(milestone_ids))
+    if contractor_ids:
+        criteria.append(Milestone.contractor_id.in_(contractor_ids))
+    if project_ids:
+        criteria.append(Milestone.project_id.in_(project_ids))
+
+    scored = 0
+    if criteria:
+        targets = [m_id for (m_id,) in db.query(Milestone.id).filter(
+            Milestone.status == MilestoneStatus.PENDING,
+            or_(*criteria)
+        )]
+        for start in range(0, len(targets), RISK_BATCH_SIZE):
+            scored += len(score_batch(db, targets[start:start + RISK_BATCH_SIZE]))
+
+    db.commit()
+    return scored
+
+
+def score_unscored(db: Session, limit: int = RISK_BATCH_SIZE) -> int:
+    """Score PENDING milestones that have no score yet, e.g. because the
+    worker that wrote them restarted before its next tick"""
+    ids = [m_id for (m_id,) in db.query(Milestone.id).outerjoin(
+        MilestoneRiskScore, MilestoneRiskScore.milestone_id == Milestone.id
+    ).filter(
+        Milestone.status == MilestoneStatus.PENDING,
+        MilestoneRiskScore.milestone_id.is_(None)
+    ).order_by(Milestone.id).limit(limit)]
+
+    if not ids:
+        return 0
+    scored = len(score_batch(db, ids))
+    db.commit()
+    return scored
+
+
+# =========================================================
+# INCREMENTAL BACKGROUND SCORER
+# =========================================================
+class RiskScorer:
+    """Collects dirty ids from change events and rescores them off the request path"""
+
+    def __init__(self, interval: float = RISK_SCORING_INTERVAL_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._milestones = set()
+        self._projects = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on_changes(self, events: List[dict]):
+        with self._lock:
+            for e in events:
+                if e["entity"] == "milestone":
+                    self._milestones.add(e["id"])
+                elif e["entity"] == "project" and e["op"] == "update":
+                    self._projects.add(e["id"])
+
+    def run_once(self) -> int:
+        with self._lock:
+            milestone_ids, self._milestones = self._milestones, set()
+            project_ids, self._projects = self._projects, set()
+
+        db = SessionLocal()
+        try:
+            scored = 0
+            if milestone_ids or project_ids:
+                scored = rescore_affected(db, milestone_ids, project_ids)
+            # Dirty sets live in memory only; this sweep catches whatever a
+            # restarted or crashed worker never got to
+            return scored + score_unscored(db)
+        except Exception as e:
+            db.rollback()
+            # Put the work back so the next tick retries it
+            with self._lock:
+                self._milestones |= milestone_ids
+                self._projects |= project_ids
+            print(f"⚠️ Risk scoring failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="risk-scorer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.run_once()
+
+
+risk_scorer = RiskScorer()
+
+# Only this worker's own writes: every worker scoring every event would
+# repeat the same work N times
+change_bus.subscribe(risk_scorer.on_changes, local_only=True)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        scored = rescore_all(db)
+    finally:
+        db.close()
+    print(f"✅ Scored {scored} pending milestone(s)")
@@ -1 +1 @@
-from . import auth, projects, milestones, users, dashboard
\ No newline at end of file
+from . import auth, projects, milestones, users, dashboard, health, changes
\ No newline at end of file
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models import User
+from ..auth import get_current_user
+from ..changes import CursorExpired, changes_since, current_cursor
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+MAX_CHANGES_PAGE = 1000
+
+
+# =========================================================
+# CURRENT CURSOR
+# =========================================================
+@router.get("/cursor")
+def get_current_cursor(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Cursor to store after a full fetch; pass it as ?since= afterwards"""
+    return {"cursor": current_cursor(db)}
+
+
+# =========================================================
+# INCREMENTAL CHANGES
+# =========================================================
+@router.get("")
+def get_changes(
+    since: int,
+    limit: int = 500,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Users, projects and milestones inserted/updated/deleted after ``since``.
+
+    Keep calling with the returned cursor while has_more is true. A 410
+    means the cursor is older than the compacted log: refetch everything
+    and start again from /changes/cursor.
+    """
+    try:
+        return changes_since(db, since, max(1, min(limit, MAX_CHANGES_PAGE)))
+    except CursorExpired:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Cursor is older than the change log; resync from /changes/cursor"
+        )
@@ -1,23 +1,33 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from typing import Optional
 
 from ..database import get_db
 from ..models import Project, Milestone, User, UserRole, ProjectStatus, MilestoneStatus
 from ..auth import get_current_user
+from ..partitions import fiscal_year_bounds
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 @router.get("/stats")
 def get_dashboard_stats(
+    fiscal_year: Optional[int] = Query(None, ge=1, le=9998),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get overall dashboard statistics"""
+    """Get overall dashboard statistics (?fiscal_year=2025 limits the milestone
+    figures to that year, which reads a single partition)"""
+    
+    # Milestone figures cover the requested fiscal year or all of them
+    in_year = []
+    if fiscal_year is not None:
+        start, end = fiscal_year_bounds(fiscal_year)
+        in_year = [Milestone.created_at >= start, Milestone.created_at < end]
     
     # Total counts
     total_projects = db.query(Project).count()
-    total_milestones = db.query(Milestone).count()
+    total_milestones = db.query(Milestone).filter(*in_year).count()
     total_users = db.query(User).count()
     
     # Project status breakdown
@@ -34,7 +44,7 @@ def get_dashboard_stats(
     milestones_by_status = db.query(
         Milestone.status,
         func.count(Milestone.id)
-    ).group_by(Milestone.status).all()
+    ).filter(*in_year).group_by(Milestone.status).all()
     
     milestone_status_counts = {
         status.value: count for status, count in milestones_by_status
@@ -44,16 +54,18 @@ def get_dashboard_stats(
     total_budget = db.query(func.sum(Project.budget)).scalar() or 0
     
     # Total funds requested in milestones
-    total_requested = db.query(func.sum(Milestone.requested_amount)).scalar() or 0
+    total_requested = db.query(func.sum(Milestone.requested_amount)).filter(*in_year).scalar() or 0
     
     # Approved funds
     approved_funds = db.query(func.sum(Milestone.requested_amount)).filter(
-        Milestone.status == MilestoneStatus.APPROVED
+        Milestone.status == MilestoneStatus.APPROVED,
+        *in_year
     ).scalar() or 0
     
     # Pending approvals (for auditors)
     pending_approvals = db.query(Milestone).filter(
-        Milestone.status == MilestoneStatus.PENDING
+        Milestone.status == MilestoneStatus.PENDING,
+        *in_year
     ).count()
     
     # User role breakdown
@@ -67,6 +79,7 @@ def get_dashboard_stats(
     }
     
     return {
+        "fiscal_year": fiscal_year,
         "total_projects": total_projects,
         "total_milestones": total_milestones,
         "total_users": total_users,
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+import os
+import threading
+import time
+
+from ..cache import entity_cache
+from ..database import engine, pool_status
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+# Probes within this window reuse the last DB check instead of opening a connection
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", 10))
+
+_check_lock = threading.Lock()
+_last_check = {"ok": False, "checked_at": 0.0, "latency_ms": None, "error": None}
+
+
+def check_database() -> dict:
+    """Run SELECT 1 at most once per interval; concurrent probes share the result"""
+    with _check_lock:
+        age = time.monotonic() - _last_check["checked_at"]
+        if _last_check["checked_at"] and age < HEALTH_CHECK_INTERVAL_SECONDS:
+            return dict(_last_check, age_seconds=round(age, 3))
+
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            _last_check.update(ok=True, error=None)
+        except Exception as e:
+            _last_check.update(ok=False, error=str(e))
+        _last_check["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        _last_check["checked_at"] = time.monotonic()
+
+        return dict(_last_check, age_seconds=0.0)
+
+
+# =========================================================
+# LEGACY HEALTH CHECK
+# =========================================================
+@router.get("")
+def health_check():
+    if check_database()["ok"]:
+        return {"status": "healthy", "database": "connected"}
+    return {"status": "unhealthy", "database": "disconnected"}
+
+
+# =========================================================
+# LIVENESS (no I/O)
+# =========================================================
+@router.get("/live")
+def liveness():
+    return {"status": "alive"}
+
+
+# =========================================================
+# READINESS (cached DB check + pool stats)
+# =========================================================
+@router.get("/ready")
+def readiness():
+    db_check = check_database()
+    body = {
+        "status": "ready" if db_check["ok"] else "not_ready",
+        "database": {
+            "connected": db_check["ok"],
+            "latency_ms": db_check["latency_ms"],
+            "checked_seconds_ago": db_check["age_seconds"],
+            "error": db_check["error"]
+        },
+        "pool": pool_status()
+    }
+    return JSONResponse(status_code=200 if db_check["ok"] else 503, content=body)
+
+
+# =========================================================
+# CACHE METRICS
+# =========================================================
+@router.get("/cache")
+def cache_stats():
+    return entity_cache.stats()
+
+
+# =========================================================
+# STARTUP TIMINGS
+# =========================================================
+@router.get("/startup")
+def startup_timings(request: Request):
+    return getattr(request.app.state, "startup_timings", {})
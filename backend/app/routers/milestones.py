@@ -1,23 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
-from sqlalchemy import func
-from ..database import get_db
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+import os
+from ..database import get_db, unit_of_work
 from ..models import (
     Milestone,
     Project,
     ProjectStatus,
     User,
     UserRole,
-    MilestoneStatus
+    MilestoneStatus,
+    MilestoneClaim,
+    MilestoneRiskScore,
+    ArchivedMilestone
 )
-from ..schemas import MilestoneCreate, MilestoneResponse
+from ..schemas import MilestoneCreate, MilestoneResponse, ClaimedMilestone
 from ..auth import get_current_user
+from ..cache import entity_cache
+from ..idempotency import idempotency_store
+from ..notifications import record_change
+from ..tasks import enqueue
 from ..utils.rbac import require_role
 
 router = APIRouter(prefix="/milestones", tags=["Milestones"])
 
+AUDIT_LEASE_SECONDS = int(os.getenv("AUDIT_LEASE_SECONDS", 900))
+MAX_CLAIM_BATCH = 50
+
+# INSERT ... ON CONFLICT, used to take a lease atomically
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
 
 # =========================================================
 # CREATE MILESTONE
@@ -25,49 +40,62 @@ router = APIRouter(prefix="/milestones", tags=["Milestones"])
 @router.post("/", response_model=MilestoneResponse, status_code=status.HTTP_201_CREATED)
 def create_milestone(
     milestone: MilestoneCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Only CONTRACTOR users can create milestones"""
     require_role([UserRole.CONTRACTOR])(current_user)
 
-    project = db.query(Project).filter(Project.id == milestone.project_id).first()
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
-    total_requested = db.query(Milestone).filter(
-        Milestone.project_id == milestone.project_id
-    ).with_entities(Milestone.requested_amount).all()
-
-    total = sum(m[0] for m in total_requested) + milestone.requested_amount
-
-    if total > project.budget:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Total milestone amount (₹{total}) exceeds project budget (₹{project.budget})"
-        )
-
-    new_milestone = Milestone(
-        project_id=milestone.project_id,
-        title=milestone.title,
-        description=milestone.description,
-        requested_amount=milestone.requested_amount,
-        contractor_id=current_user.id,
-        status=MilestoneStatus.PENDING
-    )
-
-    db.add(new_milestone)
-    db.commit()
-    db.refresh(new_milestone)
-    if project.status == ProjectStatus.CREATED:
-        project.status = ProjectStatus.IN_PROGRESS
-        db.commit()
-        db.refresh(project)
-    
-    return new_milestone
+    with idempotency_store.request(
+        db, "milestones", current_user.id, idempotency_key, milestone
+    ) as request:
+        if request.replay is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return request.replay
+
+        with unit_of_work(db):
+            # Row lock serialises concurrent requests against the same budget
+            project = db.query(Project.budget, Project.status).filter(
+                Project.id == milestone.project_id
+            ).with_for_update().first()
+            if not project:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Project not found"
+                )
+
+            total = (db.query(func.sum(Milestone.requested_amount)).filter(
+                Milestone.project_id == milestone.project_id
+            ).scalar() or 0) + milestone.requested_amount
+
+            if total > project.budget:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Total milestone amount (₹{total}) exceeds project budget (₹{project.budget})"
+                )
+
+            new_milestone = db.scalar(
+                insert(Milestone).values(
+                    project_id=milestone.project_id,
+                    title=milestone.title,
+                    description=milestone.description,
+                    requested_amount=milestone.requested_amount,
+                    contractor_id=current_user.id,
+                    status=MilestoneStatus.PENDING
+                ).returning(Milestone)
+            )
+            record_change(db, "milestone", "insert", new_milestone.id)
+
+            if project.status == ProjectStatus.CREATED:
+                # Flipped to IN_PROGRESS after commit, off the request path
+                enqueue(db, "project.sync_status", milestone.project_id)
+
+            created = MilestoneResponse.model_validate(new_milestone)
+            request.save(MilestoneResponse, created)
+
+    return created
 
 
 # =========================================================
@@ -85,13 +113,233 @@ def get_my_milestones(
         ).all()
 
     elif current_user.role == UserRole.AUDITOR:
-        return db.query(Milestone).filter(
-            Milestone.status == MilestoneStatus.PENDING
+        # Hide milestones another auditor is actively reviewing; riskiest first
+        return db.query(Milestone).outerjoin(
+            MilestoneClaim, MilestoneClaim.milestone_id == Milestone.id
+        ).outerjoin(
+            MilestoneRiskScore, MilestoneRiskScore.milestone_id == Milestone.id
+        ).filter(
+            Milestone.status == MilestoneStatus.PENDING,
+            or_(
+                MilestoneClaim.milestone_id.is_(None),
+                MilestoneClaim.auditor_id == current_user.id,
+                MilestoneClaim.lease_expires_at < datetime.utcnow()
+            )
+        ).order_by(
+            MilestoneRiskScore.score.desc().nulls_last(),
+            Milestone.created_at.asc()
         ).all()
 
     return db.query(Milestone).all()
 
 
+# =========================================================
+# AUDITOR WORK QUEUE
+# =========================================================
+QUEUE_PRIORITIES = {
+    # Unscored milestones (not yet picked up by app.risk) follow, oldest first
+    "risk": (MilestoneRiskScore.score.desc().nulls_last(), Milestone.created_at.asc()),
+    "age": (Milestone.created_at.asc(), Milestone.id.asc()),
+    "amount": (Milestone.requested_amount.desc(), Milestone.created_at.asc())
+}
+
+@router.post("/queue/claim", response_model=List[ClaimedMilestone])
+def claim_milestones(
+    limit: int = 10,
+    priority: str = "risk",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Lease the next N unclaimed PENDING milestones to the current auditor.
+
+    Ordered by precomputed risk score by default (priority=risk|age|amount).
+
+    The lease itself is taken by one upsert into milestone_claims that only
+    overwrites an expired lease, so of two concurrent auditors exactly one
+    gets each milestone; the other simply receives fewer rows. Expired
+    leases return to the queue automatically.
+    """
+    require_role([UserRole.AUDITOR])(current_user)
+
+    if priority not in QUEUE_PRIORITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"priority must be one of {sorted(QUEUE_PRIORITIES)}"
+        )
+    limit = max(1, min(limit, MAX_CLAIM_BATCH))
+    now = datetime.utcnow()
+    lease_expires_at = now + timedelta(seconds=AUDIT_LEASE_SECONDS)
+
+    # SKIP LOCKED only spreads concurrent claimers over different rows; the
+    # upsert below is what makes a lease exclusive
+    candidates = db.query(Milestone).outerjoin(
+        MilestoneClaim, MilestoneClaim.milestone_id == Milestone.id
+    ).outerjoin(
+        MilestoneRiskScore, MilestoneRiskScore.milestone_id == Milestone.id
+    ).filter(
+        Milestone.status == MilestoneStatus.PENDING,
+        or_(
+            MilestoneClaim.milestone_id.is_(None),
+            MilestoneClaim.lease_expires_at < now
+        )
+    ).order_by(
+        *QUEUE_PRIORITIES[priority]
+    ).limit(limit).with_for_update(of=Milestone, skip_locked=True).all()
+
+    claimed_ids = set()
+    if candidates:
+        insert_claims = _DIALECT_INSERTS[db.get_bind().dialect.name](MilestoneClaim)
+        claimed_ids = set(db.scalars(
+            insert_claims.values([
+                {
+                    "milestone_id": m.id,
+                    "auditor_id": current_user.id,
+                    "claimed_at": now,
+                    "lease_expires_at": lease_expires_at
+                }
+                for m in candidates
+            ]).on_conflict_do_update(
+                index_elements=[MilestoneClaim.milestone_id],
+                set_={
+                    "auditor_id": insert_claims.excluded.auditor_id,
+                    "claimed_at": insert_claims.excluded.claimed_at,
+                    "lease_expires_at": insert_claims.excluded.lease_expires_at
+                },
+                # Someone else's live lease is never taken over
+                where=MilestoneClaim.lease_expires_at < now
+            ).returning(MilestoneClaim.milestone_id)
+        ))
+
+    claimed = [
+        ClaimedMilestone(
+            **MilestoneResponse.model_validate(m).model_dump(),
+            lease_expires_at=lease_expires_at
+        )
+        for m in candidates
+        if m.id in claimed_ids
+    ]
+    db.commit()
+
+    return claimed
+
+
+@router.get("/queue/mine", response_model=List[ClaimedMilestone])
+def get_my_claims(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Milestones currently leased to the current auditor"""
+    require_role([UserRole.AUDITOR])(current_user)
+
+    rows = db.query(Milestone, MilestoneClaim.lease_expires_at).join(
+        MilestoneClaim, MilestoneClaim.milestone_id == Milestone.id
+    ).filter(
+        MilestoneClaim.auditor_id == current_user.id,
+        MilestoneClaim.lease_expires_at >= datetime.utcnow(),
+        Milestone.status == MilestoneStatus.PENDING
+    ).order_by(Milestone.created_at).all()
+
+    return [
+        ClaimedMilestone(
+            **MilestoneResponse.model_validate(m).model_dump(),
+            lease_expires_at=lease_expires_at
+        )
+        for m, lease_expires_at in rows
+    ]
+
+
+@router.post("/queue/renew")
+def renew_my_claims(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Extend every unexpired lease held by the current auditor"""
+    require_role([UserRole.AUDITOR])(current_user)
+
+    now = datetime.utcnow()
+    lease_expires_at = now + timedelta(seconds=AUDIT_LEASE_SECONDS)
+    renewed = db.query(MilestoneClaim).filter(
+        MilestoneClaim.auditor_id == current_user.id,
+        MilestoneClaim.lease_expires_at >= now
+    ).update({"lease_expires_at": lease_expires_at}, synchronize_session=False)
+    db.commit()
+
+    return {"renewed": renewed, "lease_expires_at": lease_expires_at}
+
+
+@router.delete("/queue/{milestone_id}", status_code=status.HTTP_204_NO_CONTENT)
+def release_claim(
+    milestone_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Give a leased milestone back to the queue"""
+    require_role([UserRole.AUDITOR])(current_user)
+
+    released = db.query(MilestoneClaim).filter(
+        MilestoneClaim.milestone_id == milestone_id,
+        MilestoneClaim.auditor_id == current_user.id
+    ).delete(synchronize_session=False)
+
+    if not released:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No claim on this milestone"
+        )
+
+    db.commit()
+    return None
+
+
+def _milestone_with_claim(db: Session, milestone_id: int):
+    """Load a milestone and its lease (if any) in one query"""
+    row = db.query(Milestone, MilestoneClaim).outerjoin(
+        MilestoneClaim, MilestoneClaim.milestone_id == Milestone.id
+    ).filter(Milestone.id == milestone_id).first()
+
+    return row if row else (None, None)
+
+
+def _release_claim_for_decision(db: Session, claim, current_user: User):
+    """Reject decisions on milestones leased to someone else; drop the lease otherwise"""
+    if not claim:
+        return
+
+    if claim.auditor_id != current_user.id and claim.lease_expires_at >= datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Milestone is claimed by another auditor"
+        )
+
+    db.delete(claim)
+
+
+def _decide(db: Session, milestone_id: int, **values) -> MilestoneResponse:
+    """UPDATE ... RETURNING a PENDING milestone into its decided state.
+
+    The status guard makes a concurrent decision on the same milestone a 409
+    instead of a silent overwrite.
+    """
+    milestone = db.scalar(
+        update(Milestone)
+        .where(
+            Milestone.id == milestone_id,
+            Milestone.status == MilestoneStatus.PENDING
+        )
+        .values(**values)
+        .returning(Milestone)
+    )
+
+    if not milestone:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Milestone was decided concurrently"
+        )
+
+    record_change(db, "milestone", "update", milestone_id)
+    return MilestoneResponse.model_validate(milestone)
+
+
 # =========================================================
 # FILTER MILESTONES BY STATUS
 # =========================================================
@@ -115,13 +363,21 @@ def filter_milestones_by_status(
 @router.get("/project/{project_id}", response_model=List[MilestoneResponse])
 def get_project_milestones(
     project_id: int,
+    include_archived: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Milestone).filter(
+    milestones = db.query(Milestone).filter(
         Milestone.project_id == project_id
     ).all()
 
+    if not milestones and include_archived:
+        milestones = db.query(ArchivedMilestone).filter(
+            ArchivedMilestone.project_id == project_id
+        ).all()
+
+    return milestones
+
 
 # =========================================================
 # GET MILESTONE BY ID
@@ -129,12 +385,21 @@ def get_project_milestones(
 @router.get("/{milestone_id}", response_model=MilestoneResponse)
 def get_milestone(
     milestone_id: int,
+    include_archived: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    milestone = db.query(Milestone).filter(
-        Milestone.id == milestone_id
-    ).first()
+    milestone = entity_cache.read_through(
+        "milestone",
+        milestone_id,
+        MilestoneResponse,
+        lambda: db.query(Milestone).filter(Milestone.id == milestone_id).first()
+    )
+
+    if not milestone and include_archived:
+        milestone = db.query(ArchivedMilestone).filter(
+            ArchivedMilestone.id == milestone_id
+        ).first()
 
     if not milestone:
         raise HTTPException(
@@ -157,7 +422,7 @@ def approve_milestone(
     """Only AUDITOR users can approve milestones"""
     require_role([UserRole.AUDITOR])(current_user)
     
-    milestone = db.query(Milestone).filter(Milestone.id == milestone_id).first()
+    milestone, claim = _milestone_with_claim(db, milestone_id)
     
     if not milestone:
         raise HTTPException(
@@ -171,28 +436,21 @@ def approve_milestone(
             detail=f"Milestone is already {milestone.status.value}"
         )
     
-    milestone.status = MilestoneStatus.APPROVED
-    milestone.auditor_id = current_user.id
-    milestone.approved_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(milestone)
-  
-    project = db.query(Project).filter(Project.id == milestone.project_id).first()
-    
-    if project and project.status != ProjectStatus.COMPLETED:
-        # Calculate total approved amount
-        total_approved = db.query(func.sum(Milestone.requested_amount)).filter(
-            Milestone.project_id == milestone.project_id,
-            Milestone.status == MilestoneStatus.APPROVED
-        ).scalar() or 0
-        
-        # If total approved amount equals or exceeds budget, mark as completed
-        if total_approved >= project.budget:
-            project.status = ProjectStatus.COMPLETED
-            db.commit()
-    
-    return milestone
+    with unit_of_work(db):
+        _release_claim_for_decision(db, claim, current_user)
+
+        approved = _decide(
+            db,
+            milestone_id,
+            status=MilestoneStatus.APPROVED,
+            auditor_id=current_user.id,
+            approved_at=datetime.utcnow()
+        )
+
+        # The project is completed after commit once approvals cover its budget
+        enqueue(db, "project.sync_status", approved.project_id)
+
+    return approved
 
 
 # =========================================================
@@ -206,9 +464,7 @@ def flag_milestone(
 ):
     require_role([UserRole.AUDITOR])(current_user)
 
-    milestone = db.query(Milestone).filter(
-        Milestone.id == milestone_id
-    ).first()
+    milestone, claim = _milestone_with_claim(db, milestone_id)
 
     if not milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
@@ -219,10 +475,14 @@ def flag_milestone(
             detail=f"Milestone is already {milestone.status.value}"
         )
 
-    milestone.status = MilestoneStatus.FLAGGED
-    milestone.auditor_id = current_user.id
+    with unit_of_work(db):
+        _release_claim_for_decision(db, claim, current_user)
 
-    db.commit()
-    db.refresh(milestone)
+        flagged = _decide(
+            db,
+            milestone_id,
+            status=MilestoneStatus.FLAGGED,
+            auditor_id=current_user.id
+        )
 
-    return milestone
+    return flagged
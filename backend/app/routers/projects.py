@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, insert, update
+from datetime import datetime
 from typing import List, Optional
 
-from ..database import get_db
+from ..database import get_db, unit_of_work
 from ..models import (
     Project,
     User,
     UserRole,
     ProjectStatus,
     Milestone,
-    MilestoneStatus
+    MilestoneStatus,
+    ArchivedProject
+)
+from ..schemas import (
+    ProjectCreate,
+    ProjectResponse,
+    ProjectExpanded,
+    MilestoneResponse,
+    MilestoneExpanded,
+    UserResponse
 )
-from ..schemas import ProjectCreate, ProjectResponse
 from ..auth import get_current_user
+from ..cache import entity_cache
+from ..idempotency import idempotency_store
+from ..notifications import record_change
 from ..utils.rbac import require_role
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
@@ -25,37 +37,66 @@ router = APIRouter(prefix="/projects", tags=["Projects"])
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 def create_project(
     project: ProjectCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Only GOVERNMENT users can create projects"""
     require_role([UserRole.GOVERNMENT])(current_user)
 
-    new_project = Project(
-        name=project.name,
-        description=project.description,
-        budget=project.budget,
-        creator_id=current_user.id,
-        status=ProjectStatus.CREATED
-    )
-
-    db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
-
-    return new_project
+    with idempotency_store.request(
+        db, "projects", current_user.id, idempotency_key, project
+    ) as request:
+        if request.replay is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return request.replay
+
+        with unit_of_work(db):
+            new_project = db.scalar(
+                insert(Project).values(
+                    name=project.name,
+                    description=project.description,
+                    budget=project.budget,
+                    creator_id=current_user.id,
+                    status=ProjectStatus.CREATED
+                ).returning(Project)
+            )
+            record_change(db, "project", "insert", new_project.id)
+            created = ProjectResponse.model_validate(new_project)
+            request.save(ProjectResponse, created)
+
+    return created
 
 
 # =========================================================
 # GET ALL PROJECTS
 # =========================================================
-@router.get("/", response_model=List[ProjectResponse])
+@router.get(
+    "/",
+    response_model=List[ProjectExpanded],
+    response_model_exclude_unset=True
+)
 def get_all_projects(
+    include_archived: bool = False,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """All authenticated users can view all projects"""
-    return db.query(Project).all()
+    expansions = _parse_expand(expand)
+    projects = _expanded_query(db, expansions).all()
+
+    result = [_serialize_project(project, expansions) for project in projects]
+
+    # Archived projects have no live milestones to expand
+    if include_archived:
+        result += [
+            ProjectResponse.model_validate(project)
+            for project in db.query(ArchivedProject).all()
+        ]
+
+    return result
 
 
 # =========================================================
@@ -82,6 +123,7 @@ def get_my_projects(
 @router.get("/filter/by-status", response_model=List[ProjectResponse])
 def filter_projects_by_status(
     status: Optional[ProjectStatus] = None,
+    include_archived: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -91,20 +133,112 @@ def filter_projects_by_status(
     if status:
         query = query.filter(Project.status == status)
 
-    return query.all()
+    projects = query.all()
+
+    # Only COMPLETED projects are ever archived
+    if include_archived and status in (None, ProjectStatus.COMPLETED):
+        projects += db.query(ArchivedProject).all()
+
+    return projects
+
+
+# =========================================================
+# BULK PROJECT PROGRESS
+# =========================================================
+MAX_BULK_PROGRESS_IDS = 200
+
+@router.get("/progress")
+def get_projects_progress(
+    ids: Optional[str] = None,
+    status: Optional[ProjectStatus] = None,
+    after_id: int = 0,
+    limit: int = MAX_BULK_PROGRESS_IDS,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Progress for many projects at once (?ids=1,2,3 and/or ?status=...).
+
+    A status-only request is paged by project id: pass the last project_id
+    seen as ?after_id= to get the next page.
+    """
+    project_ids = []
+    if ids:
+        try:
+            project_ids = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="ids must be a comma-separated list of integers"
+            )
+        if len(project_ids) > MAX_BULK_PROGRESS_IDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {MAX_BULK_PROGRESS_IDS} ids per request"
+            )
+
+    if not project_ids and not status:
+        raise HTTPException(
+            status_code=400,
+            detail="Pass ids and/or status"
+        )
+
+    if project_ids:
+        criteria = [Project.id.in_(project_ids)]
+        if status:
+            criteria.append(Project.status == status)
+    else:
+        page = db.query(Project.id).filter(
+            Project.status == status,
+            Project.id > after_id
+        ).order_by(Project.id).limit(max(1, min(limit, MAX_BULK_PROGRESS_IDS)))
+        criteria = [Project.id.in_(page.scalar_subquery())]
+
+    progress = _progress_for(db, *criteria)
+
+    if project_ids:
+        # Keep the caller's order; unknown ids are simply left out
+        position = {project_id: i for i, project_id in enumerate(project_ids)}
+        progress.sort(key=lambda p: position[p["project_id"]])
+
+    return progress
 
 
 # =========================================================
 # GET PROJECT BY ID
 # =========================================================
-@router.get("/{project_id}", response_model=ProjectResponse)
+@router.get(
+    "/{project_id}",
+    response_model=ProjectExpanded,
+    response_model_exclude_unset=True
+)
 def get_project(
     project_id: int,
+    include_archived: bool = False,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get a project by ID"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    """Get a project by ID (?expand=milestones,contractor,auditor for the full graph)"""
+    expansions = _parse_expand(expand)
+
+    if expansions:
+        project = _expanded_query(db, expansions).filter(Project.id == project_id).first()
+        if project:
+            project = _serialize_project(project, expansions)
+    else:
+        project = entity_cache.read_through(
+            "project",
+            project_id,
+            ProjectResponse,
+            lambda: db.query(Project).filter(Project.id == project_id).first()
+        )
+
+    if not project and include_archived:
+        project = db.query(ArchivedProject).filter(
+            ArchivedProject.id == project_id
+        ).first()
+        if project:
+            project = ProjectResponse.model_validate(project)
 
     if not project:
         raise HTTPException(
@@ -115,6 +249,69 @@ def get_project(
     return project
 
 
+# =========================================================
+# EXPANSION HELPERS
+# =========================================================
+EXPANDABLE = {"milestones", "contractor", "auditor"}
+
+def _parse_expand(expand: Optional[str]) -> set:
+    expansions = {e.strip() for e in (expand or "").split(",") if e.strip()}
+    unknown = expansions - EXPANDABLE
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown expand value(s): {sorted(unknown)}. Allowed: {sorted(EXPANDABLE)}"
+        )
+    # Contractor/auditor identities hang off milestones
+    if expansions:
+        expansions.add("milestones")
+    return expansions
+
+
+def _expanded_query(db: Session, expansions: set):
+    """Project query that eager-loads the requested graph.
+
+    Milestones come from one selectin query for all projects and their
+    contractor/auditor rows are joined into it, so the query count stays
+    fixed no matter how many milestones there are.
+    """
+    query = db.query(Project)
+
+    if "milestones" in expansions:
+        loader = selectinload(Project.milestones)
+        options = [loader]
+        if "contractor" in expansions:
+            options.append(loader.joinedload(Milestone.contractor))
+        if "auditor" in expansions:
+            options.append(loader.joinedload(Milestone.auditor))
+        query = query.options(*options)
+
+    return query
+
+
+def _serialize_project(project: Project, expansions: set):
+    """Build the response explicitly so nothing outside the eager-loaded graph is touched"""
+    if not expansions:
+        return ProjectResponse.model_validate(project)
+
+    milestones = []
+    for milestone in project.milestones:
+        related = {}
+        for relation in ("contractor", "auditor"):
+            if relation in expansions:
+                user = getattr(milestone, relation)
+                related[relation] = UserResponse.model_validate(user) if user else None
+        milestones.append(MilestoneExpanded(
+            **MilestoneResponse.model_validate(milestone).model_dump(),
+            **related
+        ))
+
+    return ProjectExpanded(
+        **ProjectResponse.model_validate(project).model_dump(),
+        milestones=milestones
+    )
+
+
 # =========================================================
 # UPDATE PROJECT STATUS
 # =========================================================
@@ -128,19 +325,24 @@ def update_project_status(
     """Only GOVERNMENT users can update project status"""
     require_role([UserRole.GOVERNMENT])(current_user)
 
-    project = db.query(Project).filter(Project.id == project_id).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
+    with unit_of_work(db):
+        project = db.scalar(
+            update(Project)
+            .where(Project.id == project_id)
+            .values(status=new_status)
+            .returning(Project)
         )
 
-    project.status = new_status
-    db.commit()
-    db.refresh(project)
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
 
-    return project
+        record_change(db, "project", "update", project.id)
+        updated = ProjectResponse.model_validate(project)
+
+    return updated
 
 
 # =========================================================
@@ -163,6 +365,15 @@ def delete_project(
             detail="Project not found"
         )
 
+    milestone_ids = [
+        m_id for (m_id,) in db.query(Milestone.id).filter(
+            Milestone.project_id == project_id
+        )
+    ]
+
+    # Milestones are removed by ON DELETE CASCADE (passive_deletes), which
+    # the session never sees, so announce them explicitly
+    record_change(db, "milestone", "delete", *milestone_ids)
     db.delete(project)
     db.commit()
 
@@ -179,41 +390,69 @@ def get_project_progress(
     current_user: User = Depends(get_current_user)
 ):
     """Calculate project progress based on milestones"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    progress = _progress_for(db, Project.id == project_id)
 
-    if not project:
+    if not progress:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
 
-    total_milestones = db.query(Milestone).filter(
-        Milestone.project_id == project_id
-    ).count()
-
-    approved_milestones = db.query(Milestone).filter(
-        Milestone.project_id == project_id,
-        Milestone.status == MilestoneStatus.APPROVED
-    ).count()
-
-    pending_milestones = db.query(Milestone).filter(
-        Milestone.project_id == project_id,
-        Milestone.status == MilestoneStatus.PENDING
-    ).count()
-
-    flagged_milestones = db.query(Milestone).filter(
-        Milestone.project_id == project_id,
-        Milestone.status == MilestoneStatus.FLAGGED
-    ).count()
-
-    total_requested = db.query(func.sum(Milestone.requested_amount)).filter(
-        Milestone.project_id == project_id
-    ).scalar() or 0
-
-    approved_amount = db.query(func.sum(Milestone.requested_amount)).filter(
-        Milestone.project_id == project_id,
-        Milestone.status == MilestoneStatus.APPROVED
-    ).scalar() or 0
+    return progress[0]
+
+
+def _progress_for(db: Session, *criteria) -> list:
+    """Progress payloads for every project matching criteria, in one query.
+
+    Milestones are aggregated per (project, status) and LEFT JOINed so
+    projects without milestones still get a row. A milestone is never older
+    than its project; saying so lets PostgreSQL skip the fiscal-year
+    partitions from before the project started.
+    """
+    rows = db.query(
+        Project.id,
+        Project.name,
+        Project.budget,
+        Project.status,
+        Milestone.status,
+        func.count(Milestone.id),
+        func.sum(Milestone.requested_amount)
+    ).outerjoin(
+        Milestone,
+        (Milestone.project_id == Project.id)
+        & (Milestone.created_at >= func.coalesce(Project.created_at, datetime.min))
+    ).filter(
+        *criteria
+    ).group_by(
+        Project.id,
+        Project.name,
+        Project.budget,
+        Project.status,
+        Milestone.status
+    ).order_by(Project.id).all()
+
+    by_project = {}
+    for project_id, name, budget, project_status, milestone_status, count, amount in rows:
+        entry = by_project.setdefault(project_id, {
+            "project": (name, budget, project_status),
+            "counts": {},
+            "amounts": {}
+        })
+        if milestone_status is not None:
+            entry["counts"][milestone_status] = count
+            entry["amounts"][milestone_status] = amount or 0
+
+    return [
+        _progress_payload(project_id, *entry["project"], entry["counts"], entry["amounts"])
+        for project_id, entry in by_project.items()
+    ]
+
+
+def _progress_payload(project_id, name, budget, project_status, counts, amounts) -> dict:
+    total_milestones = sum(counts.values())
+    approved_milestones = counts.get(MilestoneStatus.APPROVED, 0)
+    total_requested = sum(amounts.values())
+    approved_amount = amounts.get(MilestoneStatus.APPROVED, 0)
 
     completion_percentage = round(
         (approved_milestones / total_milestones * 100)
@@ -222,26 +461,26 @@ def get_project_progress(
     )
 
     budget_utilization = round(
-        (total_requested / project.budget * 100)
-        if project.budget > 0 else 0,
+        (total_requested / budget * 100)
+        if budget > 0 else 0,
         2
     )
 
     return {
         "project_id": project_id,
-        "project_name": project.name,
-        "project_budget": project.budget,
-        "project_status": project.status.value,
+        "project_name": name,
+        "project_budget": budget,
+        "project_status": project_status.value,
         "milestones": {
             "total": total_milestones,
             "approved": approved_milestones,
-            "pending": pending_milestones,
-            "flagged": flagged_milestones
+            "pending": counts.get(MilestoneStatus.PENDING, 0),
+            "flagged": counts.get(MilestoneStatus.FLAGGED, 0)
         },
         "funds": {
             "total_requested": total_requested,
             "approved_amount": approved_amount,
-            "remaining_budget": project.budget - total_requested
+            "remaining_budget": budget - total_requested
         },
         "progress": {
             "completion_percentage": completion_percentage,
@@ -6,6 +6,7 @@ from ..database import get_db
 from ..models import User, UserRole
 from ..schemas import UserResponse
 from ..auth import get_current_user
+from ..cache import entity_cache
 from ..utils.rbac import require_role
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -31,7 +32,12 @@ def get_user_by_id(
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific user by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = entity_cache.read_through(
+        "user",
+        user_id,
+        UserResponse,
+        lambda: db.query(User).filter(User.id == user_id).first()
+    )
     
     if not user:
         raise HTTPException(
@@ -71,6 +71,17 @@ class MilestoneResponse(MilestoneBase):
     class Config:
         from_attributes = True
 
+class ClaimedMilestone(MilestoneResponse):
+    lease_expires_at: datetime
+
+# Expanded (nested) read schemas; relation fields are only present when requested
+class MilestoneExpanded(MilestoneResponse):
+    contractor: Optional[UserResponse] = None
+    auditor: Optional[UserResponse] = None
+
+class ProjectExpanded(ProjectResponse):
+    milestones: Optional[List[MilestoneExpanded]] = None
+
 # Token Schemas
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,293 @@
+"""Durable follow-up jobs that run after the request's transaction commits.
+
+Handlers call ``enqueue`` inside their unit of work, so a job exists exactly
+when the write it follows up on has committed. Jobs are rows in
+``background_tasks``, and a job of the same kind for the same project is
+only queued once. On commit the worker that served the request wakes its
+local pool. Every worker also polls, so jobs left behind by a crashed or busy
+worker still run.
+
+A running job is leased for TASK_LEASE_SECONDS. Failed jobs are retried with
+exponential backoff; after TASK_MAX_ATTEMPTS they are kept with failed_at
+set. Jobs recompute from current database state, so running one twice is
+harmless. From the backend directory:
+
+    python -m app.tasks run     # drain the queue once
+    python -m app.tasks list    # queued and failed jobs
+"""
+import argparse
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, event, exists, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, unit_of_work
+from .models import BackgroundTask, Milestone, MilestoneStatus, Project, ProjectStatus
+from .notifications import record_change
+
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", 2))
+TASK_POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", 2))
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", 60))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", 5))
+TASK_RETRY_BASE_SECONDS = float(os.getenv("TASK_RETRY_BASE_SECONDS", 1))
+TASK_BATCH_SIZE = 20
+
+# INSERT ... ON CONFLICT DO NOTHING is how a duplicate job is coalesced
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+_ENQUEUED_KEY = "background_tasks_enqueued"
+
+HANDLERS: Dict[str, Callable[[Session, Optional[int]], None]] = {}
+
+
+def task(kind: str):
+    """Register a job handler; it runs in a transaction that also removes the job"""
+    def register(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+# =========================================================
+# ENQUEUE
+# =========================================================
+def enqueue(db: Session, kind: str, project_id: Optional[int] = None):
+    """Queue a job in db's transaction; a no-op if it is already queued"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown task kind: {kind}")
+
+    now = datetime.utcnow()
+    insert = _INSERTS[db.get_bind().dialect.name]
+    db.execute(
+        insert(BackgroundTask).values(
+            kind=kind,
+            project_id=project_id,
+            coalesce_key=f"{kind}:{project_id}",
+            attempts=0,
+            run_after=now,
+            created_at=now
+        ).on_conflict_do_nothing(index_elements=[BackgroundTask.coalesce_key])
+    )
+    db.info[_ENQUEUED_KEY] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _wake_workers(session: Session):
+    if session.info.pop(_ENQUEUED_KEY, False):
+        task_pool.wake()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_enqueued(session: Session):
+    session.info.pop(_ENQUEUED_KEY, None)
+
+
+# =========================================================
+# JOBS
+# =========================================================
+@task("project.sync_status")
+def sync_project_status(db: Session, project_id: Optional[int]):
+    """Move a project CREATED -> IN_PROGRESS once it has milestones and on to
+    COMPLETED once approvals cover its budget"""
+    started = db.execute(
+        update(Project)
+        .where(
+            Project.id == project_id,
+            Project.status == ProjectStatus.CREATED,
+            exists().where(Milestone.project_id == Project.id)
+        )
+        .values(status=ProjectStatus.IN_PROGRESS)
+        .returning(Project.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+    approved_total = select(
+        func.coalesce(func.sum(Milestone.requested_amount), 0)
+    ).where(
+        Milestone.project_id == project_id,
+        Milestone.status == MilestoneStatus.APPROVED
+    ).scalar_subquery()
+
+    completed = db.execute(
+        update(Project)
+        .where(
+            Project.id == project_id,
+            Project.status != ProjectStatus.COMPLETED,
+            Project.budget <= approved_total
+        )
+        .values(status=ProjectStatus.COMPLETED)
+        .returning(Project.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+    if started or completed:
+        record_change(db, "project", "update", project_id)
+
+
+# =========================================================
+# RUNNING JOBS
+# =========================================================
+def claim(db: Session, limit: int = TASK_BATCH_SIZE) -> list:
+    """Lease up to `limit` due jobs to this worker and commit the lease"""
+    now = datetime.utcnow()
+    available = or_(BackgroundTask.locked_until.is_(None), BackgroundTask.locked_until < now)
+
+    due = select(BackgroundTask.id).where(
+        BackgroundTask.failed_at.is_(None),
+        BackgroundTask.run_after <= now,
+        available
+    ).order_by(
+        BackgroundTask.run_after, BackgroundTask.id
+    ).limit(limit).with_for_update(skip_locked=True)
+
+    claimed = db.execute(
+        update(BackgroundTask)
+        # Re-checked here: SQLite has no row locks, so two workers can pick
+        # the same ids and only the first UPDATE may take them
+        .where(BackgroundTask.id.in_(due), available)
+        .values(
+            coalesce_key=None,
+            locked_until=now + timedelta(seconds=TASK_LEASE_SECONDS),
+            attempts=BackgroundTask.attempts + 1
+        )
+        .returning(BackgroundTask.id, BackgroundTask.kind, BackgroundTask.project_id, BackgroundTask.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return claimed
+
+
+def _record_failure(task_ids: List[int], attempts: int, error: Exception):
+    now = datetime.utcnow()
+    values = {"locked_until": None, "last_error": repr(error)[:1000]}
+    if attempts >= TASK_MAX_ATTEMPTS:
+        values["failed_at"] = now
+    else:
+        values["run_after"] = now + timedelta(seconds=TASK_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+    db = SessionLocal()
+    try:
+        with unit_of_work(db):
+            db.execute(
+                update(BackgroundTask)
+                .where(BackgroundTask.id.in_(task_ids))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+    finally:
+        db.close()
+
+
+def run_claimed(claimed: list) -> int:
+    """Run each distinct (kind, project) once; returns the jobs completed"""
+    groups = defaultdict(list)
+    for task_id, kind, project_id, attempts in claimed:
+        groups[(kind, project_id)].append((task_id, attempts))
+
+    done = 0
+    for (kind, project_id), jobs in groups.items():
+        task_ids = [task_id for task_id, _ in jobs]
+        db = SessionLocal()
+        try:
+            with unit_of_work(db):
+                HANDLERS[kind](db, project_id)
+                db.execute(delete(BackgroundTask).where(BackgroundTask.id.in_(task_ids)))
+            done += len(task_ids)
+        except Exception as e:
+            attempts = max(attempts for _, attempts in jobs)
+            print(f"⚠️ Task {kind} for project {project_id} failed (attempt {attempts}): {e}")
+            _record_failure(task_ids, attempts, e)
+        finally:
+            db.close()
+    return done
+
+
+# =========================================================
+# LOCAL WORKER POOL
+# =========================================================
+class TaskWorkerPool:
+    """Threads that run queued jobs as soon as this worker commits one, and
+    poll for the rest"""
+
+    def __init__(self, workers: int = TASK_WORKERS, poll_interval: float = TASK_POLL_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            claimed = claim(db)
+        finally:
+            db.close()
+        return run_claimed(claimed) if claimed else 0
+
+    def drain(self) -> int:
+        """Run jobs until none are due; returns how many completed"""
+        total = 0
+        while True:
+            done = self.run_once()
+            if not done:
+                return total
+            total += done
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # Cleared before claiming, so a wake-up during the claim is not lost
+            self._wake.clear()
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                print(f"⚠️ Task worker error: {e}")
+            self._wake.wait(self.poll_interval)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"task-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+
+task_pool = TaskWorkerPool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or inspect background tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="run every due job once")
+    commands.add_parser("list", help="show queued and failed jobs")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        print(f"✅ Ran {task_pool.drain()} task(s)")
+    else:
+        db = SessionLocal()
+        try:
+            for t in db.query(BackgroundTask).order_by(BackgroundTask.id):
+                state = "failed" if t.failed_at else "running" if t.locked_until else "queued"
+                print(f"{t.id:>6} {t.kind} project={t.project_id} {state} attempts={t.attempts} {t.last_error or ''}")
+        finally:
+            db.close()
@@ -0,0 +1,90 @@
+"""Cold-start benchmark.
+
+Boots the API in fresh interpreter processes (imports + startup handlers,
+no server) and reports each startup phase across runs. With --compare the
+child also times the ``Base.metadata.create_all`` the startup path used to
+run on every boot. Run from the backend directory:
+
+    python -m app.utils.boot_benchmark --runs 10 --compare
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from app.main import app
+asyncio.run(app.router.startup())
+result = dict(app.state.startup_timings, ready_ms=round((time.perf_counter() - started) * 1000, 1))
+if {compare}:
+    from app.database import Base, engine
+    start = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    result["create_all_ms"] = round((time.perf_counter() - start) * 1000, 1)
+asyncio.run(app.router.shutdown())
+print(json.dumps(result))
+"""
+
+
+def boot_once(compare: bool, env: dict) -> dict:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD.format(compare=compare)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Boot failed:\n{completed.stdout}\n{completed.stderr}")
+
+    # Startup prints its own progress lines; the result is the last one
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    result.pop("pool_warmup_ms", None)  # background, not on the boot path
+    return result
+
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for metric in runs[0]:
+        values = sorted(run[metric] for run in runs if metric in run)
+        summary[metric] = {
+            "min": values[0],
+            "median": round(statistics.median(values), 1),
+            "max": values[-1]
+        }
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure API cold-start time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--compare", action="store_true", help="also time create_all")
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+
+    runs = [boot_once(args.compare, env) for _ in range(args.runs)]
+
+    print(f"{'phase':<22} {'min':>9} {'median':>9} {'max':>9}")
+    for metric, stats in summarize(runs).items():
+        print(
+            f"{metric:<22} {stats['min']:>7.1f}ms {stats['median']:>7.1f}ms {stats['max']:>7.1f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
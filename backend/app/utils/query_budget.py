@@ -0,0 +1,336 @@
+"""SQL query-count budget harness.
+
+Seeds a local database, calls every endpoint once and captures the SQL it
+runs through SQLAlchemy cursor events. Each endpoint is checked against the
+query and row-scan budgets in ``backend/query_budget.json`` and the run fails
+when any endpoint goes over, so N+1 regressions show up before review.
+
+    cd backend
+    python -m app.utils.query_budget            # check against the manifest
+    python -m app.utils.query_budget --update   # record current numbers
+
+Uses a throwaway SQLite file unless --database-url points elsewhere (never at
+production: the harness drops and recreates every table). Rows scanned come
+from EXPLAIN ANALYZE on PostgreSQL; on SQLite they are estimated as the size
+of every table the plan reads with a full SCAN. Needs ``httpx`` for
+FastAPI's TestClient (requirements-dev.txt).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import event, func, select
+
+MANIFEST_PATH = Path(__file__).resolve().parents[2] / "query_budget.json"
+SEED_PASSWORD = "password123"
+
+
+# =========================================================
+# STATEMENT CAPTURE
+# =========================================================
+class QueryCounter:
+    """Collects (statement, parameters) for everything run on an engine"""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._record)
+
+
+def _pg_scanned_rows(plan: dict) -> int:
+    rows = 0
+    if "Relation Name" in plan:
+        loops = plan.get("Actual Loops", 1)
+        rows += (plan.get("Actual Rows", 0) + plan.get("Rows Removed by Filter", 0)) * loops
+    for child in plan.get("Plans", []):
+        rows += _pg_scanned_rows(child)
+    return rows
+
+
+def rows_scanned(engine, statements, table_sizes: dict) -> int:
+    """Replay captured SELECTs through EXPLAIN and add up the rows they read"""
+    total = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            if engine.dialect.name == "postgresql":
+                plan = conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters
+                ).scalar()
+                total += _pg_scanned_rows(plan[0]["Plan"])
+            else:
+                for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                    match = re.match(r"SCAN (\w+)", row[-1])
+                    if match:
+                        table = re.sub(r"_\d+$", "", match.group(1))
+                        total += table_sizes.get(table, 0)
+        conn.rollback()
+    return total
+
+
+# =========================================================
+# SEED DATA
+# =========================================================
+def seed(db) -> dict:
+    """Deterministic dataset: 20 projects with 5 milestones each"""
+    from ..auth import get_password_hash
+    from ..models import (
+        Milestone, MilestoneStatus, Project, ProjectStatus, User, UserRole
+    )
+
+    hashed = get_password_hash(SEED_PASSWORD)
+    users = {}
+    for username, role in [
+        ("gov1", UserRole.GOVERNMENT), ("gov2", UserRole.GOVERNMENT),
+        ("con1", UserRole.CONTRACTOR), ("con2", UserRole.CONTRACTOR),
+        ("con3", UserRole.CONTRACTOR),
+        ("aud1", UserRole.AUDITOR), ("aud2", UserRole.AUDITOR),
+    ]:
+        users[username] = User(
+            email=f"{username}@govichain.example.com",
+            username=username,
+            hashed_password=hashed,
+            role=role
+        )
+    db.add_all(users.values())
+    db.flush()
+
+    contractors = [users["con1"], users["con2"], users["con3"]]
+    auditors = [users["aud1"], users["aud2"]]
+    statuses = [
+        MilestoneStatus.PENDING, MilestoneStatus.APPROVED, MilestoneStatus.PENDING,
+        MilestoneStatus.FLAGGED, MilestoneStatus.APPROVED
+    ]
+
+    projects = []
+    for i in range(20):
+        project = Project(
+            name=f"Seed project {i + 1}",
+            description="Query budget seed data",
+            budget=100000,
+            status=ProjectStatus.IN_PROGRESS if i % 4 else ProjectStatus.CREATED,
+            creator_id=users["gov1" if i % 2 == 0 else "gov2"].id
+        )
+        db.add(project)
+        projects.append(project)
+    db.flush()
+
+    milestones = []
+    for i, project in enumerate(projects):
+        for j, milestone_status in enumerate(statuses):
+            auditor = None if milestone_status == MilestoneStatus.PENDING else auditors[j % 2]
+            milestone = Milestone(
+                project_id=project.id,
+                title=f"Milestone {j + 1}",
+                requested_amount=1000 * (j + 1),
+                status=milestone_status,
+                contractor_id=contractors[(i + j) % 3].id,
+                auditor_id=auditor.id if auditor else None
+            )
+            db.add(milestone)
+            milestones.append(milestone)
+    db.commit()
+
+    pending = [m.id for m in milestones if m.status == MilestoneStatus.PENDING]
+    return {
+        "users": {name: user.id for name, user in users.items()},
+        "project_id": projects[0].id,
+        "status_project_id": projects[1].id,
+        "progress_project_ids": [p.id for p in projects[:10]],
+        "delete_project_id": projects[-1].id,
+        "milestone_id": milestones[0].id,
+        "approve_milestone_id": pending[2],
+        "flag_milestone_id": pending[3],
+    }
+
+
+def cases(ids: dict):
+    """(name, method, path, username, kwargs) for every endpoint under budget"""
+    return [
+        ("POST /auth/login", "post", "/auth/login", None,
+         {"data": {"username": "gov1", "password": SEED_PASSWORD}}),
+        ("GET /users/me", "get", "/users/me", "gov1", {}),
+        ("GET /users/", "get", "/users/", "gov1", {}),
+        ("GET /users/{id}", "get", f"/users/{ids['users']['con1']}", "gov1", {}),
+        ("POST /projects/", "post", "/projects/", "gov1",
+         {"json": {"name": "Budget project", "budget": 5000}}),
+        ("GET /projects/", "get", "/projects/", "gov1", {}),
+        ("GET /projects/my-projects", "get", "/projects/my-projects", "gov1", {}),
+        ("GET /projects/filter/by-status", "get",
+         "/projects/filter/by-status?status=IN_PROGRESS", "gov1", {}),
+        ("GET /projects/{id}", "get", f"/projects/{ids['project_id']}", "gov1", {}),
+        ("GET /projects/{id}/progress", "get",
+         f"/projects/{ids['project_id']}/progress", "gov1", {}),
+        ("GET /projects/{id}?expand", "get",
+         f"/projects/{ids['project_id']}?expand=milestones,contractor,auditor", "gov1", {}),
+        ("GET /projects/?expand", "get",
+         "/projects/?expand=milestones,contractor,auditor", "gov1", {}),
+        ("GET /projects/progress?ids", "get",
+         "/projects/progress?ids=" + ",".join(str(i) for i in ids["progress_project_ids"]),
+         "gov1", {}),
+        ("GET /projects/progress?status", "get",
+         "/projects/progress?status=IN_PROGRESS", "gov1", {}),
+        ("PUT /projects/{id}/status", "put",
+         f"/projects/{ids['status_project_id']}/status?new_status=IN_PROGRESS", "gov1", {}),
+        ("DELETE /projects/{id}", "delete",
+         f"/projects/{ids['delete_project_id']}", "gov1", {}),
+        ("POST /milestones/", "post", "/milestones/", "con1",
+         {"json": {"title": "Budget milestone", "requested_amount": 100,
+                   "project_id": ids["project_id"]}}),
+        ("GET /milestones/my-milestones (contractor)", "get",
+         "/milestones/my-milestones", "con1", {}),
+        ("GET /milestones/my-milestones (auditor)", "get",
+         "/milestones/my-milestones", "aud1", {}),
+        ("GET /milestones/filter/by-status", "get",
+         "/milestones/filter/by-status?status=PENDING", "aud1", {}),
+        ("GET /milestones/project/{id}", "get",
+         f"/milestones/project/{ids['project_id']}", "gov1", {}),
+        ("GET /milestones/{id}", "get", f"/milestones/{ids['milestone_id']}", "gov1", {}),
+        ("PUT /milestones/{id}/approve", "put",
+         f"/milestones/{ids['approve_milestone_id']}/approve", "aud1", {}),
+        ("PUT /milestones/{id}/flag", "put",
+         f"/milestones/{ids['flag_milestone_id']}/flag", "aud1", {}),
+        ("GET /dashboard/stats", "get", "/dashboard/stats", "gov1", {}),
+        ("GET /dashboard/my-stats (government)", "get", "/dashboard/my-stats", "gov1", {}),
+        ("GET /dashboard/my-stats (contractor)", "get", "/dashboard/my-stats", "con1", {}),
+        ("GET /dashboard/my-stats (auditor)", "get", "/dashboard/my-stats", "aud1", {}),
+        ("GET /changes/cursor", "get", "/changes/cursor", "gov1", {}),
+        ("GET /changes", "get", "/changes?since=0&limit=500", "gov1", {}),
+        ("POST /milestones/queue/claim", "post", "/milestones/queue/claim?limit=10", "aud2", {}),
+        ("GET /milestones/queue/mine", "get", "/milestones/queue/mine", "aud2", {}),
+    ]
+
+
+# =========================================================
+# RUNNER
+# =========================================================
+def measure() -> dict:
+    """Seed the configured database and measure every endpoint case"""
+    from fastapi.testclient import TestClient
+
+    from ..auth import create_access_token
+    from ..cache import entity_cache
+    from ..database import Base, SessionLocal, engine
+    from ..main import app
+    from ..models import User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        ids = seed(db)
+        tokens = {
+            user.username: create_access_token({"sub": user.username, "role": user.role.value})
+            for user in db.query(User).all()
+        }
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    results = {}
+    for name, method, path, username, kwargs in cases(ids):
+        headers = {"Authorization": f"Bearer {tokens[username]}"} if username else {}
+        # Budgets describe the cold path, so every case starts with an empty cache
+        entity_cache.clear_local()
+
+        with count_queries(engine) as counter:
+            response = getattr(client, method)(path, headers=headers, **kwargs)
+
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} returned {response.status_code}: {response.text}")
+
+        with engine.connect() as conn:
+            table_sizes = {
+                table.name: conn.execute(select(func.count()).select_from(table)).scalar()
+                for table in Base.metadata.sorted_tables
+            }
+        results[name] = {
+            "queries": counter.count,
+            "rows_scanned": rows_scanned(engine, counter.statements, table_sizes)
+        }
+    return results
+
+
+def check(results: dict, manifest: dict) -> list:
+    """Return a failure message for every endpoint over (or missing) its budget"""
+    failures = []
+    for name, measured in results.items():
+        budget = manifest.get(name)
+        if budget is None:
+            failures.append(f"{name}: no budget in manifest (run with --update)")
+            continue
+        for metric in ("queries", "rows_scanned"):
+            if measured[metric] > budget[metric]:
+                failures.append(
+                    f"{name}: {metric} {measured[metric]} exceeds budget {budget[metric]}"
+                )
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check per-endpoint SQL query budgets")
+    parser.add_argument("--update", action="store_true", help="rewrite the manifest")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--manifest", default=str(MANIFEST_PATH))
+    args = parser.parse_args(argv)
+
+    if "app.database" in sys.modules:
+        raise RuntimeError("Run the harness in a fresh process; app.database is already bound")
+
+    workdir = tempfile.mkdtemp(prefix="query-budget-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/budget.db"
+    os.environ.setdefault("SECRET_KEY", "query-budget")
+    os.environ["CACHE_URL"] = "memory://"
+    os.environ["CHANGE_NOTIFY_BACKEND"] = "memory"
+
+    results = measure()
+
+    manifest_path = Path(args.manifest)
+    if args.update:
+        manifest_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"✅ Recorded budgets for {len(results)} endpoints in {manifest_path}")
+        return 0
+
+    manifest = json.loads(manifest_path.read_text())
+    for name, measured in results.items():
+        budget = manifest.get(name, {})
+        print(
+            f"{name:45} queries {measured['queries']:>3}/{budget.get('queries', '-'):<3} "
+            f"rows {measured['rows_scanned']:>5}/{budget.get('rows_scanned', '-')}"
+        )
+
+    failures = check(results, manifest)
+    if failures:
+        print("\n❌ Query budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\n✅ All endpoints within query budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,10 @@ api.interceptors.request.use(
   }
 );
 
+// Reuse the same key when retrying a create so the backend replays the
+// original response instead of inserting a duplicate
+const idempotent = (key) => (key ? { headers: { 'Idempotency-Key': key } } : undefined);
+
 // Auth APIs
 export const authAPI = {
   register: (userData) => api.post('/auth/register', userData),
@@ -44,10 +48,11 @@ export const authAPI = {
 // Projects APIs
 export const projectsAPI = {
   getAll: () => api.get('/projects/'),
-  getById: (id) => api.get(`/projects/${id}`),
-  create: (projectData) => api.post('/projects/', projectData),
+  getById: (id, expand) => api.get(`/projects/${id}`, expand ? { params: { expand } } : undefined),
+  create: (projectData, idempotencyKey) => api.post('/projects/', projectData, idempotent(idempotencyKey)),
   updateStatus: (id, status) => api.put(`/projects/${id}/status?new_status=${status}`),
   getProgress: (id) => api.get(`/projects/${id}/progress`),
+  getProgressBulk: (ids) => api.get(`/projects/progress?ids=${ids.join(',')}`),
   getMyProjects: () => api.get('/projects/my-projects'),
   filterByStatus: (status) => api.get(`/projects/filter/by-status?status=${status}`),
   delete: (id) => api.delete(`/projects/${id}`),
@@ -55,13 +60,17 @@ export const projectsAPI = {
 
 // Milestones APIs
 export const milestonesAPI = {
-  create: (milestoneData) => api.post('/milestones/', milestoneData),
+  create: (milestoneData, idempotencyKey) => api.post('/milestones/', milestoneData, idempotent(idempotencyKey)),
   getByProject: (projectId) => api.get(`/milestones/project/${projectId}`),
   getById: (id) => api.get(`/milestones/${id}`),
   approve: (id) => api.put(`/milestones/${id}/approve`),
   flag: (id) => api.put(`/milestones/${id}/flag`),
   getMyMilestones: () => api.get('/milestones/my-milestones'),
   filterByStatus: (status) => api.get(`/milestones/filter/by-status?status=${status}`),
+  claimNext: (limit = 10, priority = 'risk') => api.post('/milestones/queue/claim', null, { params: { limit, priority } }),
+  getMyClaims: () => api.get('/milestones/queue/mine'),
+  renewClaims: () => api.post('/milestones/queue/renew'),
+  releaseClaim: (id) => api.delete(`/milestones/queue/${id}`),
 };
 
 // Dashboard APIs
@@ -70,6 +79,12 @@ export const dashboardAPI = {
   getMyStats: () => api.get('/dashboard/my-stats'),
 };
 
+// Change feed APIs
+export const changesAPI = {
+  getCursor: () => api.get('/changes/cursor'),
+  getSince: (cursor, limit = 500) => api.get('/changes', { params: { since: cursor, limit } }),
+};
+
 // Users APIs
 export const usersAPI = {
   getAll: () => api.get('/users/'),